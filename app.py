@@ -3,10 +3,10 @@ import os
 import json
 import traceback
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from werkzeug.utils import secure_filename
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, make_response
 
 # --- Assuming these modules are in your project's backend directory ---
 # NOTE: Ensure you have 'backend/util.py', 'backend/loan.py', and 
@@ -15,8 +15,14 @@ from flask import Flask, render_template, request, redirect, url_for, flash, ses
 try:
     from backend import util as util_mod
     from backend import loan as loan_mod
+    from backend import auto_invest as auto_invest_mod
+    from backend import store
+    from backend.search import loan_index
+    from backend import archive as archive_mod
+    from backend import risk as risk_mod
+    from backend.cache import response_cache, etag_for
     from backend.notification_service import notification_service
-    from backend.blockchain import publish_to_blockchain
+    from backend.blockchain import publish_to_blockchain, publish_batch_to_blockchain
 except ImportError:
     # Fallback/Placeholder functions if backend modules are not present for testing
     print("Warning: Backend modules (util_mod, loan_mod, etc.) not found. Using placeholders.")
@@ -26,19 +32,40 @@ except ImportError:
         def read_json(self, p): return []
         def hash_password(self, p): return "hashed_password"
         def verify_password(self, p, h): return True
+        def needs_rehash(self, h): return False
+        DUMMY_PASSWORD_HASH = "hashed_password"
+        def run_hash_job(self, fn, *args): return fn(*args)
         def validate_password(self, p): return True, "Password is valid"
-        def get_loan_stats(self, p): return {"total_loans": 0, "pending_loans": 0}
-        def list_loans(self): return []
+        def get_loan_stats(self): return {"total_loans": 0, "pending_loans": 0}
+        def list_loans(self, status=None): return []
+        def get_loan(self, l): return None
+        def iter_loans(self, **kwargs): return iter([])
+        def iter_users(self, **kwargs): return iter([])
+        def paginate(self, items, page=1, per_page=25, total=None): return {"items": [], "page": 1, "per_page": per_page, "total": 0, "pages": 1}
         def get_user_loans(self, u, r): return []
         def add_loan_request(self, **kwargs): return {"id": 99, "status": "pending", "amount": kwargs.get("amount", 0), "borrower_username": kwargs.get("borrower_username")}
         def fund_loan(self, l, u): return {"amount": 100, "borrower_username": "borrower"}
         def approve_loan(self, l): return {"amount": 100, "borrower_username": "borrower"}
         def reject_loan(self, l): pass
+        def approve_loans(self, ids): return [], []
+        def reject_loans(self, ids): return [], []
+        def notify_loan_decisions(self, loans, decision): return 0
+        def set_criteria(self, username, **kwargs): return {}
+        def run_matching(self, limit=None): return []
+    class HashPoolBusy(Exception): pass
     
     util_mod = PlaceholderModule()
+    auto_invest_mod = PlaceholderModule()
+    store = None
+    loan_index = None
+    archive_mod = None
+    risk_mod = None
+    response_cache = None
     loan_mod = PlaceholderModule()
     notification_service = PlaceholderModule()
     def publish_to_blockchain(event, data): pass
+    def publish_batch_to_blockchain(event, items): pass
+    util_mod.HashPoolBusy = HashPoolBusy
     
 
 # --- Configuration ---
@@ -53,34 +80,38 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True) # Ensure uploads folder
 
 USERS_FILE = "data/users.json"
 LOANS_FILE = "data/loans.json"
+ADMIN_PAGE_SIZE = 25
 if not os.path.exists(USERS_FILE): util_mod.write_json(USERS_FILE, [])
 if not os.path.exists(LOANS_FILE): util_mod.write_json(LOANS_FILE, [])
+if store: store.recover() # finish any commit interrupted by a crash
+# Move settled/rejected loans out of loans.json in the background (0 disables)
+ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", 3600))
+if archive_mod and ARCHIVE_INTERVAL > 0: archive_mod.start_archiver(ARCHIVE_INTERVAL)
 
 # Backend shortcuts
 read_json = lambda p: util_mod.read_json(p)
 write_json = lambda p,d: util_mod.write_json(p,d)
-hash_password = util_mod.hash_password
-verify_password = util_mod.verify_password
+# KDF work runs on util's bounded hashing pool rather than the request thread
+hash_password = lambda p: util_mod.run_hash_job(util_mod.hash_password, p)
+verify_password = lambda p, h: util_mod.run_hash_job(util_mod.verify_password, p, h)
 get_loan_stats = util_mod.get_loan_stats
 list_loans = loan_mod.list_loans
+get_loan = loan_mod.get_loan
+iter_loans = loan_mod.iter_loans
+iter_users = util_mod.iter_users
 get_user_loans = loan_mod.get_user_loans
 add_loan_request = loan_mod.add_loan_request
 fund_loan = loan_mod.fund_loan
 approve_loan = loan_mod.approve_loan
 reject_loan = loan_mod.reject_loan
+approve_loans = loan_mod.approve_loans
+reject_loans = loan_mod.reject_loans
 
 # --- User utilities ---
-def get_all_users(): return read_json(USERS_FILE) or []
+def get_user_counts(): return store.counts("user") if store else {}
 def get_user_by_username(username):
-    return next((u for u in get_all_users() if u.get("username") == username), None)
-def update_user(user):
-    users = get_all_users()
-    found = False
-    for i,u in enumerate(users):
-        if u.get("username")==user.get("username"):
-            users[i]=user; found=True; break
-    if not found: users.append(user)
-    write_json(USERS_FILE, users)
+    # Dict lookup in the store's cached snapshot (re-read only when the files change)
+    return store.read_user(username) if store else None
 def refresh_session_user():
     username = session.get("username")
     if username:
@@ -92,6 +123,51 @@ def refresh_session_user():
 @app.before_request
 def make_session_permanent(): session.permanent = True
 
+@app.errorhandler(util_mod.HashPoolBusy)
+def hash_pool_busy(e):
+    # Shed login/register bursts instead of letting them queue without bound
+    return Response("Too many sign-in attempts right now, please retry in a moment.", status=503,
+                    headers={"Retry-After": "2"})
+
+# --- Response cache ---
+APP_STARTED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+
+def _data_last_modified():
+    committed_at = store.last_commit_time() if store else None
+    if not committed_at:
+        return APP_STARTED_AT
+    return datetime.fromisoformat(committed_at).replace(tzinfo=timezone.utc, microsecond=0)
+
+def cached_fragment(key, render):
+    """
+    Render role-scoped HTML shared by every user of that role (e.g. the
+    lender's available-loans table) once per `key`, which must include the
+    store generation; pages compose it into their per-user shell.
+    """
+    if response_cache is None:
+        return render()
+    return response_cache.get_or_render(key, render)
+
+def conditional_page(key, render, last_modified):
+    """
+    Serve render() with an ETag for `key` (everything the page depends on:
+    data generation, role, user, query) and Last-Modified. Browsers
+    revalidating with If-None-Match or If-Modified-Since get a 304 without
+    any rendering.
+    """
+    # Flashed messages are one-shot and rendered into the page: never revalidate those
+    if response_cache is None or session.get("_flashes"):
+        return render()
+
+    resp = Response(mimetype="text/html")
+    resp.set_etag(etag_for(key))
+    resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "private, no-cache"
+    if resp.make_conditional(request).status_code == 304:
+        return resp
+    resp.set_data(render())
+    return resp
+
 # --- File Upload Utilities (NEW/FIXED SECTION) ---
 ALLOWED_EXTENSIONS = {"pdf", "jpg", "jpeg", "png"}
 
@@ -144,6 +220,10 @@ def register():
             flash("All fields required", "danger")
             return redirect(url_for("register"))
 
+        if store is None:
+            flash("Registration is unavailable right now.", "danger")
+            return redirect(url_for("register"))
+
         if get_user_by_username(username):
             flash("Username already exists", "danger")
             return redirect(url_for("register"))
@@ -153,24 +233,25 @@ def register():
             flash(msg, "danger")
             return redirect(url_for("register"))
 
-        # Get all users
-        users = get_all_users()
-
-        # Assign unique ID
-        new_id = max([u.get("id", 0) for u in users] + [0]) + 1
+        password_hash = hash_password(password)
 
-        # Create user
-        new_user = {
-            "id": new_id,
-            "username": username,
-            "password_hash": hash_password(password),
-            "role": role,
-            "balance": 1000.0 if role == "lender" else 0.0,
-            "created_at": datetime.utcnow().isoformat()
-        }
+        def _create(txn):
+            # Create user (insert fails if the username was taken concurrently; the id claim if the id was)
+            new_user = {
+                "id": txn.next_id("user"),
+                "username": username,
+                "password_hash": password_hash,
+                "role": role,
+                "balance": 1000.0 if role == "lender" else 0.0,
+                "created_at": datetime.utcnow().isoformat()
+            }
+            txn.put_user(new_user, insert=True)
 
-        users.append(new_user)
-        write_json(USERS_FILE, users)
+        try:
+            store.run_transaction(_create)
+        except store.TransactionConflict:
+            flash("Username already exists", "danger")
+            return redirect(url_for("register"))
 
         flash("Registration successful. Please login.", "success")
         return redirect(url_for("login"))
@@ -186,16 +267,32 @@ def login():
         username = (request.form.get("username") or "").strip()
         password = request.form.get("password") or ""
         user = get_user_by_username(username)
+        if not user:
+            # Same KDF time as a wrong password, so response times don't reveal which usernames exist
+            verify_password(password, util_mod.DUMMY_PASSWORD_HASH)
 
         if user and verify_password(password, user.get("password_hash")):
-            # Assign ID if missing (for old users/admin)
-            if "id" not in user:
-                users = get_all_users()
-                for idx, u in enumerate(users):
-                    if u["username"] == user["username"]:
-                        user["id"] = idx + 1
-                        break
-                write_json(USERS_FILE, users)
+            # Upgrade legacy / weaker hashes now that we have the plaintext
+            new_hash = None
+            if util_mod.needs_rehash(user.get("password_hash")):
+                try:
+                    new_hash = hash_password(password)
+                except util_mod.HashPoolBusy:
+                    pass  # try again on the next login
+
+            # Assign ID if missing (for old users/admin) and store the new hash in one write
+            if "id" not in user or new_hash:
+                def _upgrade(txn):
+                    current = txn.get_user(username)
+                    if current is None:
+                        return user
+                    if "id" not in current:
+                        current["id"] = txn.next_id("user")
+                    if new_hash and current.get("password_hash") == user.get("password_hash"):
+                        current["password_hash"] = new_hash  # unless the password changed meanwhile
+                    txn.put_user(current)
+                    return current
+                user = store.run_transaction(_upgrade)
 
             # Check role mismatch (skip for admin to avoid loop)
             if role_param and user["role"] != role_param and user["role"] != "admin":
@@ -230,30 +327,39 @@ def dashboard():
         flash("Login required", "warning")
         return redirect(url_for("login"))
 
-    loans = list_loans()
-    my_loans = get_user_loans(user["username"], user["role"])
-    stats = get_loan_stats(LOANS_FILE)
-    all_users = get_all_users()
+    if user["role"] not in ("borrower", "lender", "admin"):
+        # fallback
+        return redirect(url_for("index"))
+
+    # Revalidates until a loan or user commit bumps the store generation
+    generation = store.generation() if store else 0
+    key = ("dashboard", generation, user["role"], user["username"], request.query_string)
+    return conditional_page(key, lambda: _render_dashboard(user, generation), _data_last_modified())
+
+def _render_dashboard(user, generation):
+    stats = get_loan_stats()
 
     if user["role"] == "borrower":
+        my_loans = get_user_loans(user["username"], user["role"])
+        user_counts = get_user_counts()
         return render_template(
             "borrower.html",
             username=user["username"],
             balance=user["balance"],
             my_loans=my_loans,
             total_loans=stats["total_loans"],
-            total_lenders=len([u for u in all_users if u["role"] == "lender"]),
-            total_borrowers=len([u for u in all_users if u["role"] == "borrower"])
+            total_lenders=user_counts.get("lender", 0),
+            total_borrowers=user_counts.get("borrower", 0)
         )
 
     elif user["role"] == "lender":
-        # Pending loans available for funding
-        available_loans = [l for l in loans if l.get("status") == "pending"]
+        my_loans = get_user_loans(user["username"], user["role"])
 
-        # Add anonymized borrower ID for lender
-        for loan in available_loans:
-            borrower = loan.get("borrower_username", "N/A")
-            loan["borrower_anon_id"] = borrower[:2] + "****"
+        # Pending loans available for funding, with borrower risk: the same for every lender
+        available_loans_html = cached_fragment(
+            ("dashboard", generation, "lender", "available_loans"),
+            lambda: render_template("_available_loans.html", available_loans=_available_loans())
+        )
 
         # Funded loans by this lender
         funded_loans = [l for l in my_loans if l.get("status") in ["approved_by_lender", "funded"]]
@@ -262,35 +368,160 @@ def dashboard():
             "lender.html",
             username=user["username"],
             balance=user["balance"],
-            available_loans=available_loans,
+            available_loans_html=available_loans_html,
+            total_available=stats["pending_loans"],
             funded_loans=funded_loans,
-            total_loans=stats["total_loans"]
+            total_loans=stats["total_loans"],
+            auto_invest=user.get("auto_invest") or {}
         )
 
     elif user["role"] == "admin":
-        # Loans waiting for final approval
-        pending_approvals = [l for l in loans if l.get("status") == "approved_by_lender"]
-
-        borrowers = [u for u in all_users if u["role"] == "borrower"]
-        lenders = [u for u in all_users if u["role"] == "lender"]
-
-        # Add anonymized borrower ID for template
-        for loan in pending_approvals:
-            if "borrower_anon_id" not in loan:
-                loan["borrower_anon_id"] = loan.get("borrower_username", "N/A")
+        role_counts = get_user_counts()
+        loans_page_num = request.args.get("loans_page", 1, type=int)
+        users_page_num = request.args.get("users_page", 1, type=int)
+        admin_tables_html = cached_fragment(
+            ("dashboard", generation, "admin", loans_page_num, users_page_num),
+            lambda: _render_admin_tables(loans_page_num, users_page_num, role_counts)
+        )
 
         return render_template(
             "admin.html",
             username=user["username"],
             total_loans=stats["total_loans"],
             total_pending=stats["pending_loans"],
-            pending_loans=pending_approvals,
-            borrowers=borrowers,
-            lenders=lenders
+            admin_tables_html=admin_tables_html,
+            total_borrowers=role_counts.get("borrower", 0),
+            total_lenders=role_counts.get("lender", 0)
         )
 
-    # fallback
-    return redirect(url_for("index"))
+def _available_loans():
+    # Status index lookup in the store snapshot
+    available_loans = list_loans(status="pending")
+
+    # Add anonymized borrower ID and risk (one aggregate lookup per loan) for lender
+    for loan in available_loans:
+        borrower = loan.get("borrower_username", "N/A")
+        loan["borrower_anon_id"] = borrower[:2] + "****"
+        loan["risk"] = risk_mod.get_risk(borrower) if risk_mod else None
+    return available_loans
+
+def _render_admin_tables(loans_page_num, users_page_num, role_counts):
+    # Loans waiting for final approval: a status index lookup in the store snapshot
+    loans_page = util_mod.paginate(list_loans(status="approved_by_lender"), loans_page_num, ADMIN_PAGE_SIZE)
+
+    # Role totals come from the snapshot header, so the users pass stops after the page
+    non_admin_users = (u for u in iter_users() if u.get("role") in ("borrower", "lender"))
+    users_page = util_mod.paginate(
+        non_admin_users, users_page_num, ADMIN_PAGE_SIZE,
+        total=role_counts.get("borrower", 0) + role_counts.get("lender", 0)
+    )
+
+    # Add anonymized borrower ID for template
+    for loan in loans_page["items"]:
+        if "borrower_anon_id" not in loan:
+            loan["borrower_anon_id"] = loan.get("borrower_username", "N/A")
+
+    return render_template(
+        "_admin_tables.html",
+        pending_loans=loans_page["items"],
+        loans_page=loans_page,
+        users=users_page["items"],
+        users_page=users_page
+    )
+
+# --- Admin exports (streamed CSV/NDJSON, bounded memory) ---
+EXPORT_MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def _export_response(records, fields, fmt, filename):
+    if fmt == "csv":
+        chunks = util_mod.stream_csv(records, fields)
+    else:
+        chunks = util_mod.stream_ndjson({k: r.get(k) for k in fields} for r in records)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    )
+
+@app.route("/admin/export/loans.<fmt>")
+def admin_export_loans(fmt):
+    user = refresh_session_user()
+    if not user or user.get("role") != "admin":
+        flash("Access denied. Admins only.", "danger")
+        return redirect(url_for("login"))
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    records = iter_loans(
+        status=request.args.get("status") or None,
+        lender_username=request.args.get("lender") or None,
+        date_from=request.args.get("from") or None,
+        date_to=request.args.get("to") or None
+    )
+    return _export_response(records, loan_mod.LOAN_EXPORT_FIELDS, fmt, "loans")
+
+@app.route("/admin/export/users.<fmt>")
+def admin_export_users(fmt):
+    user = refresh_session_user()
+    if not user or user.get("role") != "admin":
+        flash("Access denied. Admins only.", "danger")
+        return redirect(url_for("login"))
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    records = iter_users(
+        role=request.args.get("role") or None,
+        date_from=request.args.get("from") or None,
+        date_to=request.args.get("to") or None
+    )
+    return _export_response(records, util_mod.USER_EXPORT_FIELDS, fmt, "users")
+
+
+# --- Admin batch approve / reject ---
+def _admin_batch_action(action, event_type, decision):
+    user = refresh_session_user()
+    if not user or user.get("role") != "admin":
+        flash("Access denied. Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    payload = request.get_json(silent=True) or {}
+    loan_ids = payload.get("loan_ids") or request.form.getlist("loan_ids")
+    if not loan_ids:
+        if request.is_json:
+            return jsonify({"error": "loan_ids is required"}), 400
+        flash("Select at least one loan.", "warning")
+        return redirect(url_for("dashboard"))
+
+    results, changed = action(loan_ids)
+
+    # One blockchain record and one notification batch for the whole commit
+    if changed:
+        try:
+            publish_batch_to_blockchain(event_type, changed)
+        except Exception as e:
+            print(f"[admin batch {decision} blockchain ERROR] {type(e).__name__}: {e}")
+        try:
+            notification_service.notify_loan_decisions(changed, decision)
+        except Exception as e:
+            print(f"[admin batch {decision} notification ERROR] {type(e).__name__}: {e}")
+
+    if request.is_json:
+        return jsonify({"results": results, "succeeded": len(changed), "failed": len(results) - len(changed)})
+
+    failed = [r for r in results if not r["ok"]]
+    if changed:
+        flash(f"{len(changed)} loan(s) {decision}.", "success")
+    for r in failed:
+        flash(f"Loan {r['id']}: {r['error']}", "danger")
+    return redirect(url_for("dashboard"))
+
+@app.route("/admin/loans/approve", methods=["POST"])
+def admin_approve_loans():
+    return _admin_batch_action(approve_loans, "loan_approved", "approved")
+
+@app.route("/admin/loans/reject", methods=["POST"])
+def admin_reject_loans():
+    return _admin_batch_action(reject_loans, "loan_rejected", "rejected")
 
 
 # --- Loan routes ---
@@ -371,7 +602,7 @@ def fund_loan_route(loan_id):
         return redirect(url_for("login"))
 
     # Fetch loan
-    loan = next((l for l in list_loans() if str(l.get("id")) == str(loan_id)), None)
+    loan = get_loan(loan_id)
     if not loan:
         flash("Loan not found.", "danger")
         return redirect(url_for("dashboard"))
@@ -393,14 +624,10 @@ def fund_loan_route(loan_id):
         flash("Insufficient balance to fund this loan.", "danger")
         return redirect(url_for("dashboard"))
 
-    # Fund loan safely
+    # Fund loan safely (loan status and lender balance commit together)
     try:
         funded_loan = fund_loan(loan_id, user["username"])
 
-        # Deduct lender balance
-        user["balance"] -= loan_amount
-        update_user(user)
-
         # Notify & log on blockchain
         publish_to_blockchain("loan_funded", funded_loan)
         notification_service.notify_loan_funded(
@@ -418,37 +645,116 @@ def fund_loan_route(loan_id):
         flash("❌ Funding failed due to a system error. Please try again or contact support.", "danger")
         return redirect(url_for("dashboard"))
 
+# --- Auto-invest ---
+@app.route("/auto_invest", methods=["POST"])
+def auto_invest_settings():
+    user = refresh_session_user()
+    if not user or user.get("role") != "lender":
+        flash("Access denied. Only lenders can use auto-invest.", "danger")
+        return redirect(url_for("login"))
+
+    try:
+        auto_invest_mod.set_criteria(
+            user["username"],
+            min_amount=request.form.get("min_amount") or 0,
+            max_amount=request.form.get("max_amount"),
+            max_duration=request.form.get("max_duration"),
+            budget=request.form.get("budget") or 0,
+            enabled=request.form.get("enabled") == "on"
+        )
+        flash("Auto-invest settings saved.", "success")
+    except Exception as e:
+        flash(str(e), "danger")
+    return redirect(url_for("dashboard"))
+
+@app.route("/admin/auto_invest/run", methods=["POST"])
+def admin_run_auto_invest():
+    user = refresh_session_user()
+    if not user or user.get("role") != "admin":
+        flash("Access denied. Admins only.", "danger")
+        return redirect(url_for("login"))
+
+    limit = request.form.get("limit", type=int) or request.args.get("limit", type=int)
+    try:
+        funded = auto_invest_mod.run_matching(limit=limit)
+    except store.TransactionConflict:
+        # Loans or lenders kept changing under every retry; nothing was committed
+        if request.is_json or request.accept_mimetypes.best == "application/json":
+            return jsonify({"error": "Loans changed during matching, please retry"}), 409
+        flash("Loans changed during matching, nothing was funded. Please retry.", "warning")
+        return redirect(url_for("dashboard"))
+
+    if funded:
+        try:
+            publish_batch_to_blockchain("loan_funded", funded)
+        except Exception as e:
+            print(f"[auto_invest blockchain ERROR] {type(e).__name__}: {e}")
+        try:
+            notification_service.notify_loan_decisions(funded, "funded")
+        except Exception as e:
+            print(f"[auto_invest notification ERROR] {type(e).__name__}: {e}")
+
+    if request.is_json or request.accept_mimetypes.best == "application/json":
+        return jsonify({"funded": [l["id"] for l in funded], "count": len(funded)})
+    flash(f"Auto-invest matched {len(funded)} loan(s).", "success")
+    return redirect(url_for("dashboard"))
+
+# --- Loan search API ---
+@app.route("/api/loans/search")
+def search_loans_api():
+    user = refresh_session_user()
+    if not user or user.get("role") not in ("lender", "admin"):
+        return jsonify({"error": "Login as a lender to search loans"}), 401
+
+    args = request.args
+    per_page = min(max(args.get("per_page", 20, type=int), 1), 100)
+    results = loan_index.search(
+        q=args.get("q", ""),
+        min_amount=args.get("min_amount", type=float),
+        max_amount=args.get("max_amount", type=float),
+        min_duration=args.get("min_duration", type=int),
+        max_duration=args.get("max_duration", type=int),
+        page=args.get("page", 1, type=int),
+        per_page=per_page
+    )
+    return jsonify(results)
+
 def status(): return jsonify({"status":"ok"})
+ABOUT_FEATURES = [
+    {
+        "title": "Secure Blockchain Storage",
+        "desc": "All loan requests, approvals, and transactions are permanently recorded on-chain, ensuring transparency and preventing tampering."
+    },
+    {
+        "title": "Anonymized Borrowers",
+        "desc": "Borrowers remain completely anonymous to protect privacy, while lenders see only verified loan data for safe investment decisions."
+    },
+    {
+        "title": "Fast Loan Funding",
+        "desc": "Borrow or lend within minutes through an intuitive dashboard that simplifies posting, approving, and funding loans."
+    },
+    {
+        "title": "Real-Time Tracking",
+        "desc": "Track loan status, repayment schedules, and interest calculations instantly, giving complete control and visibility to all users."
+    },
+    {
+        "title": "Low Risk & Transparent",
+        "desc": "With immutable records and verified borrower data, lenders can confidently fund loans with minimal risk exposure."
+    },
+    {
+        "title": "Designed for Everyone",
+        "desc": "BlockLoan provides a simple, clean interface for borrowers, lenders, and admins—accessible anywhere, anytime."
+    }
+]
+
 @app.route("/about")
 def about():
-    features = [
-        {
-            "title": "Secure Blockchain Storage",
-            "desc": "All loan requests, approvals, and transactions are permanently recorded on-chain, ensuring transparency and preventing tampering."
-        },
-        {
-            "title": "Anonymized Borrowers",
-            "desc": "Borrowers remain completely anonymous to protect privacy, while lenders see only verified loan data for safe investment decisions."
-        },
-        {
-            "title": "Fast Loan Funding",
-            "desc": "Borrow or lend within minutes through an intuitive dashboard that simplifies posting, approving, and funding loans."
-        },
-        {
-            "title": "Real-Time Tracking",
-            "desc": "Track loan status, repayment schedules, and interest calculations instantly, giving complete control and visibility to all users."
-        },
-        {
-            "title": "Low Risk & Transparent",
-            "desc": "With immutable records and verified borrower data, lenders can confidently fund loans with minimal risk exposure."
-        },
-        {
-            "title": "Designed for Everyone",
-            "desc": "BlockLoan provides a simple, clean interface for borrowers, lenders, and admins—accessible anywhere, anytime."
-        }
-    ]
-
-    return render_template("about.html", features=features)
+    # Static page: rendered once per process, then served from memory / revalidated by ETag
+    # (the nav bar differs for logged-in users, so the role is part of the key)
+    key = ("about", session.get("role") if session.get("user_id") else None)
+    render = lambda: cached_fragment(key, lambda: render_template("about.html", features=ABOUT_FEATURES))
+    return conditional_page(key, render, APP_STARTED_AT)
+
 @app.route('/register/borrower', methods=['GET', 'POST'])
 def register_borrower():
     # Placeholder for a role-specific register page
@@ -0,0 +1,218 @@
+"""
+ASGI deployment mode.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5004          # ASGI
+    gunicorn -w 2 --threads 8 app:app                    # sync WSGI, unchanged
+
+The Flask views run unchanged on a bounded thread pool (ASGI_THREADS), while
+everything slow that isn't view logic happens on the event loop:
+- request bodies (uploads) are read from the client before a thread is taken,
+  and spooled to a temp file on a helper thread once they pass 1 MB;
+- responses are written back to the client from the loop; streamed exports
+  are produced on a pool thread and paced by a small queue;
+- Multichain publishes and SMTP sessions are queued on the loop by
+  backend/async_io.py and run on non-blocking clients, so a funding request
+  frees its thread as soon as the commit is durable.
+
+One process can therefore hold many more in-flight requests than it has
+threads. scripts/bench_asgi.py compares both modes.
+"""
+import os, sys, asyncio, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from app import app as flask_app
+from backend import async_io
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 16))
+SPOOL_BYTES = 1024 * 1024
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the request was read or the response was sent."""
+
+
+class WsgiBridge:
+    """Minimal ASGI -> WSGI adapter (HTTP + lifespan) running the WSGI app on its own pool."""
+    def __init__(self, wsgi_app, threads=ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi-wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        loop = asyncio.get_running_loop()
+        async_io.start(loop)  # servers without lifespan support
+        try:
+            body = await self._read_body(receive, loop)
+        except ClientDisconnected:
+            return  # never run a view on a truncated body
+        # The pool thread pushes ("start", status, headers), then body chunks, then None;
+        # the small queue makes a slow client pause a streamed export instead of buffering it
+        queue = asyncio.Queue(maxsize=8)
+        cancelled = threading.Event()
+        done = loop.run_in_executor(self.executor, self._run, self._environ(scope, body), queue, loop, cancelled)
+        try:
+            started = False
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, tuple):
+                    await send({"type": "http.response.start", "status": item[1], "headers": item[2]})
+                    started = True
+                elif item:
+                    await send({"type": "http.response.body", "body": item, "more_body": True})
+            try:
+                await done
+            except Exception as e:
+                print(f"[asgi] unhandled error: {type(e).__name__}: {e}")
+                if not started:
+                    await send({"type": "http.response.start", "status": 500,
+                                "headers": [(b"content-type", b"text/plain")]})
+                    await send({"type": "http.response.body", "body": b"Internal Server Error", "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except BaseException:
+            # Client went away (or we were cancelled): stop the producer and free its thread
+            cancelled.set()
+            while not queue.empty():
+                queue.get_nowait()
+            try:
+                await asyncio.shield(done)
+            except Exception:
+                pass
+            raise
+        finally:
+            body.close()
+
+    def _run(self, environ, queue, loop, cancelled):
+        """
+        Call the WSGI app on a pool thread and feed the response into `queue`.
+        The whole response is produced on this one thread, so streamed views
+        (stream_with_context) keep their request context. Stops (closing the
+        app's iterator) as soon as `cancelled` is set.
+        """
+        state = {"start": None, "sent": False}
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=0.5)
+                except FutureTimeout:
+                    if cancelled.is_set():
+                        future.cancel()
+                        raise ClientDisconnected()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and state["sent"]:
+                raise exc_info[1].with_traceback(exc_info[2])
+            state["start"] = ("start", int(status.split(" ", 1)[0]),
+                              [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers])
+            return write
+
+        def flush():
+            if not state["sent"]:
+                if state["start"] is None:
+                    raise Exception("WSGI application did not call start_response")
+                put(state["start"])
+                state["sent"] = True
+
+        def write(data):
+            flush()
+            put(data)
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                chunks = iter(result)
+                # start_response may legally be deferred until the first chunk is produced
+                first = next(chunks, None)
+                if state["start"] and any(k == b"content-length" for k, _ in state["start"][2]):
+                    data = (first or b"") + b"".join(chunks)  # buffered response: one hop back to the loop
+                    flush()
+                    put(data)
+                else:
+                    flush()
+                    if first:
+                        put(first)
+                    for chunk in chunks:
+                        if cancelled.is_set():
+                            raise ClientDisconnected()
+                        put(chunk)
+                flush()
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        except ClientDisconnected:
+            return
+        finally:
+            if not cancelled.is_set():
+                put(None)
+
+    async def _read_body(self, receive, loop):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                raise ClientDisconnected()
+            chunk = message.get("body", b"")
+            if chunk:
+                size += len(chunk)
+                if size > SPOOL_BYTES:
+                    await loop.run_in_executor(None, body.write, chunk)  # on disk now
+                else:
+                    body.write(chunk)
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        return body
+
+    def _environ(self, scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = "HTTP_" + name
+            value = value.decode("latin-1")
+            if name in environ:
+                # Repeated headers fold with ","; Cookie (one header per cookie over HTTP/2) with "; "
+                value = f"{environ[name]}{'; ' if name == 'HTTP_COOKIE' else ','}{value}"
+            environ[name] = value
+        return environ
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                async_io.start(asyncio.get_running_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await async_io.stop()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = WsgiBridge(flask_app)
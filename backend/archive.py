@@ -0,0 +1,242 @@
+"""
+Hot/cold partitioning of the loan book.
+
+Active loans (pending, approved_by_lender, funded) stay in data/loans.json.
+Terminal loans (rejected, repaid, completed) are moved by `archive_terminal_loans`
+into append-only monthly segments, data/archive/loans-YYYY-MM.ndjson. Lookups
+go through small JSON index shards under data/archive/index/, picked by key
+hash and loaded only when asked for:
+
+    ids-XX.json       loan id  -> [segment, byte offset, length]
+    borrower-XX.json  username -> {loan id: [segment, byte offset, length]}
+    lender-XX.json    username -> {loan id: [segment, byte offset, length]}
+
+so a single archived loan or one user's archived loans is one shard read plus
+one seek per loan. Archived counts by status are a store aggregate updated in
+the same commit that deletes the hot copies.
+"""
+import os, json, threading, time
+from collections import OrderedDict
+from itertools import groupby
+from datetime import datetime, timedelta
+from backend import util, store, snapshot
+
+archive_dir = "data/archive"
+index_dir = os.path.join(archive_dir, "index")
+archive_lock_file = os.path.join(archive_dir, ".lock")
+COUNTS_AGGREGATE = "archived_counts"
+
+TERMINAL_STATUSES = ("rejected", "repaid", "completed")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 7))
+INDEX_SHARDS = 64
+INDEX_CACHE_SHARDS = int(os.getenv("ARCHIVE_INDEX_CACHE_SHARDS", 16))
+USER_FIELDS = {"borrower": "borrower_username", "lender": "lender_username"}
+
+
+# -----------------------------
+# Index
+# -----------------------------
+def _shard_path(kind, key):
+    return os.path.join(index_dir, f"{kind}-{snapshot.key_hash(key) % INDEX_SHARDS:02x}.json")
+
+def _id_shard(loan):
+    return _shard_path("ids", loan["id"])
+
+def _read_shard(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+class _ShardCache:
+    """The most recently used index shards, reloaded when another worker rewrites one (read-only)."""
+    def __init__(self, size):
+        self.lock = threading.Lock()
+        self.size = size
+        self.shards = OrderedDict()  # path -> (mtime, data)
+
+    def get(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        with self.lock:
+            cached = self.shards.get(path)
+            if cached and cached[0] == mtime:
+                self.shards.move_to_end(path)
+                return cached[1]
+        data = _read_shard(path)
+        with self.lock:
+            self.shards[path] = (mtime, data)
+            self.shards.move_to_end(path)
+            while len(self.shards) > self.size:
+                self.shards.popitem(last=False)
+        return data
+
+_shards = _ShardCache(INDEX_CACHE_SHARDS)
+
+def _write_index(entries):
+    """Merge (loan, entry) pairs into the id and per-user shards (caller holds the archive lock)."""
+    updates = {}  # (kind, path) -> {key: value}
+    for loan, entry in entries:
+        updates.setdefault(("ids", _shard_path("ids", loan["id"])), {})[loan["id"]] = entry
+        for kind, field in USER_FIELDS.items():
+            name = loan.get(field)
+            if name:
+                user_entries = updates.setdefault((kind, _shard_path(kind, name)), {}).setdefault(name, {})
+                user_entries[loan["id"]] = entry
+    os.makedirs(index_dir, exist_ok=True)
+    for (kind, path), changes in updates.items():
+        data = _read_shard(path)
+        if kind == "ids":
+            data.update(changes)
+        else:
+            for name, user_entries in changes.items():
+                data.setdefault(name, {}).update(user_entries)
+        util.write_file_atomic(path, json.dumps(data))
+
+def _count_archived(data, changes):
+    """Store aggregate: archived loans by status, counted when the hot copy is deleted."""
+    changed = False
+    for kind, old, new in changes:
+        # The archiver is the only thing that deletes loans
+        if kind == "loan" and new is None and old and old.get("status") in TERMINAL_STATUSES:
+            data[old["status"]] = data.setdefault(old["status"], 0) + 1
+            changed = True
+    return changed
+
+def _build_counts(hot_loans):
+    hot_ids = {l.get("id") for l in hot_loans if l.get("status") in TERMINAL_STATUSES}
+    counts = {}
+    for loan in iter_archived_loans():
+        if loan.get("id") not in hot_ids:  # archived but not yet deleted: still counted as hot
+            counts[loan.get("status")] = counts.get(loan.get("status"), 0) + 1
+    return counts
+
+store.register_aggregate(COUNTS_AGGREGATE, _count_archived, _build_counts)
+
+def _terminal_time(loan):
+    for field in ("rejected_at", "repaid_at", "completed_at", "approved_at", "funded_at", "created_at"):
+        if loan.get(field):
+            return str(loan[field])
+    return datetime.utcnow().isoformat()
+
+
+# -----------------------------
+# Archiving (background)
+# -----------------------------
+def archive_terminal_loans(older_than_days=None, limit=None):
+    """
+    Move terminal loans older than the cutoff out of the hot store. Loans are
+    appended to their month's segment and indexed first, then deleted from
+    loans.json in one version-checked transaction that also counts them; a
+    crash or conflict in between only leaves an uncounted duplicate that the
+    hot store shadows until the next run. Returns the number moved.
+    """
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+    try:
+        with store.FileLock(archive_lock_file, blocking=False):
+            return _archive(cutoff, limit)
+    except BlockingIOError:
+        return 0  # another worker is archiving
+
+def _archive(cutoff, limit):
+    candidates = []
+    for loan in store.Transaction().loans():
+        if loan.get("status") in TERMINAL_STATUSES and _terminal_time(loan) <= cutoff:
+            candidates.append(loan)
+            if limit and len(candidates) >= limit:
+                break
+    if not candidates:
+        return 0
+
+    by_segment = {}
+    for path, loans in groupby(sorted(candidates, key=_id_shard), key=_id_shard):
+        indexed = _read_shard(path)  # one id shard at a time
+        for loan in loans:
+            # A loan left behind by a deferred run goes back to the segment it is already in,
+            # so every copy of a loan is in one segment (see iter_archived_loans)
+            entry = indexed.get(loan["id"])
+            segment = entry[0] if entry else f"loans-{_terminal_time(loan)[:7]}.ndjson"
+            by_segment.setdefault(segment, []).append(loan)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    entries = []
+    for segment, loans in by_segment.items():
+        with open(os.path.join(archive_dir, segment), "ab") as f:
+            for loan in loans:
+                line = (json.dumps(loan, ensure_ascii=False) + "\n").encode("utf-8")
+                offset = f.tell()
+                f.write(line)
+                entries.append((loan, [segment, offset, len(line)]))
+            f.flush()
+            os.fsync(f.fileno())
+    _write_index(entries)
+
+    try:
+        store.run_transaction(lambda txn: [txn.delete_loan(l) for l in candidates])
+    except store.TransactionConflict as e:
+        # Something changed one of them meanwhile; the hot copy still wins, retry next run
+        print(f"[archive] deferred: {e}")
+        return 0
+    print(f"[archive] moved {len(candidates)} terminal loan(s) to {len(by_segment)} segment(s)")
+    return len(candidates)
+
+def start_archiver(interval_seconds=3600):
+    """Run archive_terminal_loans periodically in a daemon thread."""
+    def _loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                archive_terminal_loans()
+            except Exception as e:
+                print(f"[archive] error: {e}")
+    thread = threading.Thread(target=_loop, name="loan-archiver", daemon=True)
+    thread.start()
+    return thread
+
+
+# -----------------------------
+# Lookups
+# -----------------------------
+def _read_entry(entry):
+    segment, offset, length = entry[:3]
+    with open(os.path.join(archive_dir, segment), "rb") as f:
+        f.seek(offset)
+        return json.loads(f.read(length).decode("utf-8"))
+
+def get_archived_loan(loan_id):
+    entry = _shards.get(_shard_path("ids", loan_id)).get(loan_id)
+    return _read_entry(entry) if entry else None
+
+def get_archived_user_loans(username, role):
+    kind = role if role in USER_FIELDS else None
+    if kind is None or not username:
+        return []
+    entries = _shards.get(_shard_path(kind, username)).get(username) or {}
+    return [_read_entry(e) for e in entries.values()]
+
+def iter_archived_loans():
+    """
+    Stream every archived loan, segment by segment. A loan archived again
+    after a deferred run has more than one line, always in the same segment;
+    the last one wins. Holds one segment's loans at a time.
+    """
+    if not os.path.isdir(archive_dir):
+        return
+    for segment in sorted(os.listdir(archive_dir)):
+        if not segment.endswith(".ndjson"):
+            continue
+        latest = {}  # loan id -> loan, in order of each id's last line
+        with open(os.path.join(archive_dir, segment), "rb") as f:
+            for line in f:
+                loan = json.loads(line.decode("utf-8"))
+                latest.pop(loan.get("id"), None)
+                latest[loan.get("id")] = loan
+        yield from latest.values()
+
+def archived_counts():
+    """Archived loans by status, e.g. {"rejected": 120}."""
+    return dict(store.aggregate_items(COUNTS_AGGREGATE))
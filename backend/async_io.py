@@ -0,0 +1,140 @@
+"""
+Event-loop side of the ASGI deployment (asgi.py).
+
+Under ASGI the Flask views still run on a small thread pool, but the slow
+network side effects — the Multichain RPC POST and SMTP sessions — are handed
+to the server's event loop with `submit` and awaited there on non-blocking
+clients (httpx / aiosmtplib). A funding request therefore returns as soon as
+its commit is durable instead of holding a thread for the RPC and mail round
+trips, and one process can keep many of those calls in flight.
+
+Under the plain Flask/WSGI server no loop is attached, `active()` is False
+and callers take their existing blocking paths.
+"""
+import os, asyncio, threading
+
+try:
+    import httpx
+except ImportError:  # falls back to requests on a thread
+    httpx = None
+
+try:
+    import aiosmtplib
+except ImportError:  # falls back to smtplib on a thread
+    aiosmtplib = None
+
+MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", 500))
+
+_loop = None
+_slots = None
+_http = None
+_tasks = set()
+_lock = threading.Lock()
+
+
+# -----------------------------
+# Loop lifecycle
+# -----------------------------
+def start(loop):
+    """Attach the server's event loop (idempotent); called from the ASGI lifespan or first request."""
+    global _loop, _slots
+    with _lock:
+        if _loop is loop:
+            return
+        _loop = loop
+        _slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+    print(f"[async_io] side effects run on the event loop (max {MAX_IN_FLIGHT} in flight)")
+
+def active():
+    return _loop is not None and _loop.is_running()
+
+async def stop(timeout=10):
+    """Let queued side effects finish (up to `timeout` seconds), then close the HTTP client."""
+    global _loop, _http
+    if _tasks:
+        await asyncio.wait(list(_tasks), timeout=timeout)
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+    _loop = None
+
+def submit(coro):
+    """Schedule a coroutine on the attached loop from any thread; failures are logged, not raised."""
+    if _loop is None:
+        coro.close()
+        raise RuntimeError("no event loop attached")
+    if _on_loop_thread():
+        _track(_loop.create_task(_bounded(coro)))
+    else:
+        _loop.call_soon_threadsafe(lambda: _track(_loop.create_task(_bounded(coro))))
+
+def _on_loop_thread():
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+async def _bounded(coro):
+    # Queued calls wait here as cheap coroutines instead of opening unbounded connections
+    async with _slots:
+        return await coro
+
+def _track(task):
+    _tasks.add(task)
+    task.add_done_callback(_done)
+
+def _done(task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[async_io] background task failed: {task.exception()}")
+
+def pending():
+    return len(_tasks)
+
+
+# -----------------------------
+# Clients
+# -----------------------------
+async def post_json(url, payload, auth=None, timeout=5):
+    """POST a JSON body and return the decoded JSON reply."""
+    global _http
+    if httpx is None:
+        import requests
+        return await asyncio.to_thread(
+            lambda: requests.post(url, json=payload, auth=auth, timeout=timeout).json())
+    if _http is None:
+        _http = httpx.AsyncClient(limits=httpx.Limits(max_connections=MAX_IN_FLIGHT))
+    response = await _http.post(url, json=payload, auth=auth, timeout=timeout)
+    return response.json()
+
+async def send_messages(host, port, username, password, messages, use_tls=True):
+    """Send MIME messages over one SMTP session; returns how many were accepted."""
+    if aiosmtplib is None:
+        return await asyncio.to_thread(_send_messages_blocking, host, port, username, password, messages, use_tls)
+    sent = 0
+    async with aiosmtplib.SMTP(hostname=host, port=port, start_tls=use_tls, timeout=30) as server:
+        if password:
+            await server.login(username, password)
+        for message in messages:
+            try:
+                await server.send_message(message)
+                sent += 1
+            except aiosmtplib.SMTPException as e:
+                print(f"Error sending email to {message['To']}: {e}")
+    return sent
+
+def _send_messages_blocking(host, port, username, password, messages, use_tls):
+    import smtplib
+    sent = 0
+    with smtplib.SMTP(host, port) as server:
+        if use_tls:
+            server.starttls()
+        if password:
+            server.login(username, password)
+        for message in messages:
+            try:
+                server.send_message(message)
+                sent += 1
+            except smtplib.SMTPException as e:
+                print(f"Error sending email to {message['To']}: {e}")
+    return sent
@@ -0,0 +1,132 @@
+"""
+Auto-invest matching engine — lenders register criteria once and a matching
+pass allocates pending loans to them in a single batch.
+
+Criteria live on the lender's user record under "auto_invest":
+    {"enabled": True, "min_amount": 50, "max_amount": 500,
+     "max_duration": 12, "budget": 2000}
+`budget` is what is still left to invest; it is drawn down as loans are allocated.
+"""
+import heapq
+from datetime import datetime
+from backend import util, store
+from backend import loan as loan_mod
+
+# -----------------------------
+# Criteria
+# -----------------------------
+def set_criteria(username, min_amount=0, max_amount=None, max_duration=None, budget=0, enabled=True):
+    min_amount = util.safe_float(min_amount)
+    max_amount = util.safe_float(max_amount) if max_amount not in (None, "") else None
+    max_duration = int(max_duration) if max_duration not in (None, "") else None
+    budget = util.safe_float(budget)
+    if min_amount < 0 or budget < 0:
+        raise Exception("Amounts must not be negative")
+    if max_amount is not None and max_amount < min_amount:
+        raise Exception("Maximum amount must be at least the minimum amount")
+    if max_duration is not None and max_duration <= 0:
+        raise Exception("Maximum duration must be positive")
+
+    criteria = {
+        "enabled": bool(enabled),
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "max_duration": max_duration,
+        "budget": budget
+    }
+
+    def _work(txn):
+        user = txn.get_user(username)
+        if not user or user.get("role") != "lender":
+            raise Exception("Only lenders can use auto-invest")
+        user["auto_invest"] = criteria
+        txn.put_user(user)
+        return criteria
+
+    return store.run_transaction(_work)
+
+def _matches(criteria, amount, duration):
+    if amount < criteria.get("min_amount", 0):
+        return False
+    if criteria.get("max_amount") is not None and amount > criteria["max_amount"]:
+        return False
+    if criteria.get("max_duration") is not None and duration > criteria["max_duration"]:
+        return False
+    return True
+
+# -----------------------------
+# Matching pass
+# -----------------------------
+def run_matching(limit=None):
+    """
+    Allocate pending loans (oldest first) to auto-invest lenders (most
+    available funds first). All allocations go through the same
+    pending -> approved_by_lender transition as fund_loan and are committed
+    as one store transaction. Returns the funded loans.
+    """
+    return store.run_transaction(lambda txn: _match(txn, limit))
+
+def _match(txn, limit):
+    # Pending loans, oldest request first (a status index lookup, not a pass over the book)
+    pending = [(l.get("created_at") or "", l.get("id")) for l in txn.find_loans("status", "pending")]
+    heapq.heapify(pending)
+    pending_count = len(pending)
+
+    # Lenders keyed by what they can still invest: min(balance, remaining budget)
+    lenders = {}
+    available = []
+    for u in txn.find_users("role", "lender"):
+        criteria = u.get("auto_invest") or {}
+        if not criteria.get("enabled"):
+            continue
+        funds = min(util.safe_float(u.get("balance")), util.safe_float(criteria.get("budget")))
+        if funds > 0:
+            lenders[u["username"]] = u
+            available.append((-funds, u["username"]))
+    heapq.heapify(available)
+
+    now = datetime.utcnow().isoformat()
+    funded = []
+    while pending and available and (limit is None or len(funded) < limit):
+        _, loan_id = heapq.heappop(pending)
+        loan = txn.get_loan(loan_id)
+        try:
+            amount = float(loan.get("amount", 0))
+            duration = int(loan.get("duration_months", 0))
+        except (TypeError, ValueError):
+            continue
+        # Richest lender can't cover it -> nobody can
+        if -available[0][0] < amount:
+            continue
+
+        skipped, chosen = [], None
+        while available:
+            neg_funds, username = heapq.heappop(available)
+            if -neg_funds < amount:
+                skipped.append((neg_funds, username))
+                break
+            if _matches(lenders[username]["auto_invest"], amount, duration) and username != loan.get("borrower_username"):
+                chosen = (neg_funds, username)
+                break
+            skipped.append((neg_funds, username))
+        for entry in skipped:
+            heapq.heappush(available, entry)
+        if chosen is None:
+            continue
+
+        lender = txn.get_user(chosen[1])
+        loan_mod._fund_transition(loan, lender["username"], now)
+        loan["auto_invested"] = True
+        lender["balance"] = util.safe_float(lender.get("balance")) - amount
+        lender["auto_invest"]["budget"] = util.safe_float(lender["auto_invest"].get("budget")) - amount
+        txn.put_loan(loan)
+        txn.put_user(lender)
+        lenders[lender["username"]] = lender
+        funded.append(loan)
+
+        funds = -chosen[0] - amount
+        if funds > 0:
+            heapq.heappush(available, (-funds, lender["username"]))
+
+    print(f"[auto_invest] matched {len(funded)} of {pending_count} pending loan(s)")
+    return funded
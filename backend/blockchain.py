@@ -2,22 +2,71 @@ import requests
 import json
 import os
 from datetime import datetime
+from backend import async_io
+
+def _rpc_settings():
+    """Multichain RPC settings from config.py, or the environment when there is no config module."""
+    try:
+        from config import (
+            MULTICHAIN_RPC_USER,
+            MULTICHAIN_RPC_PASSWORD,
+            MULTICHAIN_RPC_PORT,
+            MULTICHAIN_RPC_HOST,
+        )
+        return MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD, MULTICHAIN_RPC_PORT, MULTICHAIN_RPC_HOST
+    except ImportError:
+        return (os.getenv("MULTICHAIN_RPC_USER", "multichainrpc"),
+                os.getenv("MULTICHAIN_RPC_PASSWORD", ""),
+                int(os.getenv("MULTICHAIN_RPC_PORT", 8570)),
+                os.getenv("MULTICHAIN_RPC_HOST", "127.0.0.1"))
 
 def publish_to_blockchain(event_type, data):
     """
     Publishes loan events to Multichain for immutable record.
     Supports: loan_request, loan_funded, loan_repayment, loan_completed, user_registered
+    Under the ASGI server the RPC is queued on the event loop and None is returned
+    (the TX id is only logged).
     """
-    from config import (
-        MULTICHAIN_RPC_USER,
-        MULTICHAIN_RPC_PASSWORD,
-        MULTICHAIN_RPC_PORT,
-        MULTICHAIN_RPC_HOST,
-    )
+    if async_io.active():
+        async_io.submit(publish_to_blockchain_async(event_type, data))
+        return None
+
+    MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD, MULTICHAIN_RPC_PORT, MULTICHAIN_RPC_HOST = _rpc_settings()
     
     url = f"http://{MULTICHAIN_RPC_HOST}:{MULTICHAIN_RPC_PORT}"
     headers = {"content-type": "application/json"}
+    payload = _publish_payload(event_type, data)
     
+    try:
+        response = requests.post(
+            url,
+            data=json.dumps(payload),
+            headers=headers,
+            auth=(MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD),
+            timeout=5
+        ).json()
+        return _publish_result(event_type, response)
+    
+    except Exception as e:
+        print(f"[Blockchain] Connection warning: {e}. Events logged locally.")
+        return None
+
+async def publish_to_blockchain_async(event_type, data):
+    """Non-blocking publish_to_blockchain for the event loop."""
+    MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD, MULTICHAIN_RPC_PORT, MULTICHAIN_RPC_HOST = _rpc_settings()
+    try:
+        response = await async_io.post_json(
+            f"http://{MULTICHAIN_RPC_HOST}:{MULTICHAIN_RPC_PORT}",
+            _publish_payload(event_type, data),
+            auth=(MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD),
+            timeout=5
+        )
+        return _publish_result(event_type, response)
+    except Exception as e:
+        print(f"[Blockchain] Connection warning: {e}. Events logged locally.")
+        return None
+
+def _publish_payload(event_type, data):
     event_data = {
         "event_type": event_type,
         "timestamp": datetime.now().isoformat(),
@@ -27,41 +76,33 @@ def publish_to_blockchain(event_type, data):
     json_text = json.dumps(event_data)
     hex_data = json_text.encode().hex()
     
-    payload = {
+    return {
         "method": "publish",
         "params": ["loan_stream", event_type, hex_data],
         "id": 1,
     }
+
+def _publish_result(event_type, response):
+    if response.get("error") is not None:
+        print(f"[Blockchain] Error publishing {event_type}:", response.get("error"))
+        return None
     
-    try:
-        response = requests.post(
-            url,
-            data=json.dumps(payload),
-            headers=headers,
-            auth=(MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD),
-            timeout=5
-        ).json()
-        
-        if response.get("error") is not None:
-            print(f"[Blockchain] Error publishing {event_type}:", response.get("error"))
-            return None
-        
-        tx_id = response.get("result")
-        print(f"[Blockchain] Published {event_type} - TX: {tx_id}")
-        return tx_id
-    
-    except Exception as e:
-        print(f"[Blockchain] Connection warning: {e}. Events logged locally.")
+    tx_id = response.get("result")
+    print(f"[Blockchain] Published {event_type} - TX: {tx_id}")
+    return tx_id
+
+def publish_batch_to_blockchain(event_type, items):
+    """
+    Publishes a batch of same-type events as a single stream item,
+    so bulk admin actions cost one RPC round trip instead of one per loan.
+    """
+    if not items:
         return None
+    return publish_to_blockchain(event_type, {"count": len(items), "items": items})
 
 def get_blockchain_events(event_type=None):
     """Retrieve events from blockchain stream"""
-    from config import (
-        MULTICHAIN_RPC_USER,
-        MULTICHAIN_RPC_PASSWORD,
-        MULTICHAIN_RPC_PORT,
-        MULTICHAIN_RPC_HOST,
-    )
+    MULTICHAIN_RPC_USER, MULTICHAIN_RPC_PASSWORD, MULTICHAIN_RPC_PORT, MULTICHAIN_RPC_HOST = _rpc_settings()
     
     try:
         url = f"http://{MULTICHAIN_RPC_HOST}:{MULTICHAIN_RPC_PORT}"
@@ -0,0 +1,71 @@
+"""
+LRU cache for rendered HTML, capped by total size.
+
+Keys include the store generation (bumped on every loan/user commit in any
+worker), so entries go stale by construction the moment data changes — no
+explicit invalidation needed; stale versions just age out of the LRU.
+"""
+import os, time, hashlib, threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl and time.time() - entry[2] > self.ttl):
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.time())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return value
+
+    def get_or_render(self, key, render):
+        value = self.get(key)
+        return value if value is not None else self.set(key, render())
+
+    def _drop(self, key):
+        value, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+def etag_for(key):
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20]
+
+
+response_cache = FragmentCache(
+    max_bytes=int(float(os.getenv("RESPONSE_CACHE_MB", 32)) * 1024 * 1024),
+    ttl=int(os.getenv("RESPONSE_CACHE_TTL", 300))
+)
@@ -3,29 +3,70 @@ import os, uuid, traceback
 # NOTE: Assuming util, refresh_session_user, and notification_service are correctly imported/available
 # If you receive errors about these, ensure they are defined or imported in your main app.py
 from backend import util
+from backend import store
+from backend import archive
+from backend import risk  # registers the borrower-history aggregate updated on every loan commit
 from backend.notification_service import notification_service
 
 loans_file = "data/loans.json"
 # System-defined default interest rate (10% annual)
 DEFAULT_SYSTEM_INTEREST_RATE = 0.10 
 
+# Column order used by CSV/NDJSON exports
+LOAN_EXPORT_FIELDS = [
+    "id", "borrower_username", "lender_username", "amount", "duration_months",
+    "status", "interest_rate", "interest_amount", "total_repayment",
+    "description", "created_at", "funded_at", "approved_at"
+]
+
 # -----------------------------
 # Internal helper
 # -----------------------------
-def _list_loans():
-    # Ensure loans_file exists or return an empty list if read fails gracefully
-    return util.read_json(loans_file) or []
+USER_LOAN_FIELDS = {"borrower": "borrower_username", "lender": "lender_username"}
+
+def list_loans(status=None):
+    """Hot loans from the store snapshot; with a status, only those (an index lookup, not a scan)."""
+    if status:
+        return store.find_loans("status", status)
+    return list(store.Transaction().loans())
+
+def iter_loans(status=None, lender_username=None, date_from=None, date_to=None):
+    """
+    Stream loans one at a time, optionally filtered by status, lender and
+    created_at range. Archived loans follow the hot ones when the status
+    filter allows terminal loans; one that is still hot (archived but not yet
+    deleted) was already yielded, so memory stays flat however big the book is.
+    """
+    def _keep(loan):
+        if status and loan.get("status") != status:
+            return False
+        if lender_username and loan.get("lender_username") != lender_username:
+            return False
+        return util.in_date_range(loan.get("created_at"), date_from, date_to)
 
-def list_loans():
-    return _list_loans()
+    txn = store.Transaction()  # one generation for both passes
+    for loan in txn.loans():
+        if _keep(loan):
+            yield loan
+    if status and status not in archive.TERMINAL_STATUSES:
+        return
+    for loan in archive.iter_archived_loans():
+        if _keep(loan) and txn.get_loan(loan.get("id")) is None:
+            yield loan
+
+def get_loan(loan_id):
+    """Look a loan up by id in the hot store, falling back to the archive."""
+    loan = store.read_loan(loan_id)
+    return loan if loan else archive.get_archived_loan(loan_id)
 
 def get_user_loans(username, role):
-    all_loans = _list_loans()
-    if role == "borrower":
-        return [l for l in all_loans if l.get("borrower_username") == username]
-    elif role == "lender":
-        return [l for l in all_loans if l.get("lender_username") == username]
-    return []
+    """A borrower's or lender's loans: hot ones by index lookup, then archived ones."""
+    field = USER_LOAN_FIELDS.get(role)
+    if not field:
+        return []
+    loans = store.find_loans(field, username)
+    hot_ids = {l.get("id") for l in loans}  # this user's loans only
+    return loans + [l for l in archive.get_archived_user_loans(username, role) if l.get("id") not in hot_ids]
 
 # -----------------------------
 # Add Loan Request (Borrower)
@@ -38,7 +79,6 @@ def add_loan_request(
     description=None,
     proof_of_income=None
 ):
-    loans = _list_loans()
     loan_id = str(uuid.uuid4())
 
     new_loan = {
@@ -56,8 +96,7 @@ def add_loan_request(
         "approved_at": None
     }
 
-    loans.append(new_loan)
-    util.write_json(loans_file, loans)
+    store.run_transaction(lambda txn: txn.put_loan(new_loan, insert=True))
 
     # Notify borrower (does not break on error)
     try:
@@ -70,68 +109,134 @@ def add_loan_request(
 # -----------------------------
 # Fund Loan 
 # -----------------------------
+def _fund_transition(loan, lender_username, now, rate=DEFAULT_SYSTEM_INTEREST_RATE):
+    """pending -> approved_by_lender. Shared by single funding and auto-invest batches."""
+    if loan.get("status") != "pending":
+        # Raise a specific, informative exception
+        raise Exception("Loan is not available for funding")
+
+    # --- Defensive Data Retrieval and Conversion ---
+    try:
+        loan_amount = float(loan.get("amount", 0))
+        duration_months = int(loan.get("duration_months", 0))
+    except ValueError as e:
+        # If conversion fails (e.g., 'amount' is "ABC")
+        raise Exception(f"Loan data contains invalid numerical values: {e}")
+
+    # --- Update Loan Fields ---
+    loan["lender_username"] = lender_username
+    # Set the rate used by the system
+    loan["interest_rate"] = rate 
+
+    # --- Calculations (using converted, safe variables) ---
+    loan["interest_amount"] = util.get_interest_amount(loan_amount, rate, duration_months)
+    loan["total_repayment"] = util.get_total_repayment(loan_amount, loan["interest_amount"])
+
+    # --- Finalize Status ---
+    loan["status"] = "approved_by_lender"
+    loan["funded_at"] = now
+
 def fund_loan(loan_id, lender_username): # Removed interest_rate argument
-    loans = _list_loans()
-    
-    # Use the system default rate for calculation
-    rate = DEFAULT_SYSTEM_INTEREST_RATE 
-
-    for loan in loans:
-        if loan.get("id") == loan_id:
-            if loan.get("status") != "pending":
-                # Raise a specific, informative exception
-                raise Exception("Loan is not available for funding")
-            
-            # --- Defensive Data Retrieval and Conversion ---
-            try:
-                loan_amount = float(loan.get("amount", 0))
-                duration_months = int(loan.get("duration_months", 0))
-            except ValueError as e:
-                # If conversion fails (e.g., 'amount' is "ABC")
-                raise Exception(f"Loan data contains invalid numerical values: {e}")
-
-            # --- Update Loan Fields ---
-            loan["lender_username"] = lender_username
-            # Set the rate used by the system
-            loan["interest_rate"] = rate 
-            
-            # --- Calculations (using converted, safe variables) ---
-            loan["interest_amount"] = util.get_interest_amount(loan_amount, rate, duration_months)
-            loan["total_repayment"] = util.get_total_repayment(loan_amount, loan["interest_amount"])
-            
-            # --- Finalize Status and Save ---
-            loan["status"] = "approved_by_lender"
-            loan["funded_at"] = datetime.utcnow().isoformat()
-            
-            util.write_json(loans_file, loans)
-            return loan
-            
-    # If the loop finishes without finding the loan
-    raise Exception("Loan not found")
+    """Fund a pending loan and debit the lender's balance in one atomic transaction."""
+    def _work(txn):
+        loan = txn.get_loan(loan_id)
+        if not loan:
+            raise Exception("Loan not found")
+        lender = txn.get_user(lender_username)
+        if not lender:
+            raise Exception("Lender not found")
+
+        # Use the system default rate for calculation
+        _fund_transition(loan, lender_username, datetime.utcnow().isoformat())
+
+        # Balance is checked against the committed record, so two lenders racing
+        # on the same loan (or one lender on two loans) can't overspend
+        balance = util.safe_float(lender.get("balance"))
+        if balance < loan["amount"]:
+            raise Exception("Insufficient balance to fund this loan")
+        lender["balance"] = balance - loan["amount"]
+
+        txn.put_loan(loan)
+        txn.put_user(lender)
+        return loan
+
+    return store.run_transaction(_work)
 
 # -----------------------------
 # Approve Loan (finalize)
 # -----------------------------
 def approve_loan(loan_id):
-    loans = _list_loans()
-    for loan in loans:
-        if loan["id"] == loan_id:
-            if loan["status"] != "approved_by_lender":
-                raise Exception("Loan must be funded first")
-            loan["status"] = "funded"
-            loan["approved_at"] = datetime.utcnow().isoformat()
-            util.write_json(loans_file, loans)
-            return loan
-    raise Exception("Loan not found")
+    results, changed = approve_loans([loan_id])
+    if not changed:
+        raise Exception(results[0]["error"])
+    return changed[0]
 
 # -----------------------------
 # Reject Loan
 # -----------------------------
 def reject_loan(loan_id):
-    loans = _list_loans()
-    for loan in loans:
-        if loan["id"] == loan_id:
-            loan["status"] = "rejected"
-            util.write_json(loans_file, loans)
-            return loan
-    raise Exception("Loan not found")
\ No newline at end of file
+    results, changed = reject_loans([loan_id])
+    if not changed:
+        raise Exception(results[0]["error"])
+    return changed[0]
+
+# -----------------------------
+# Batch Approve / Reject (admin)
+# -----------------------------
+def _approve_transition(txn, loan, now):
+    if loan.get("status") != "approved_by_lender":
+        raise Exception("Loan must be funded first")
+    loan["status"] = "funded"
+    loan["approved_at"] = now
+
+def _reject_transition(txn, loan, now):
+    if loan.get("status") not in ("pending", "approved_by_lender"):
+        raise Exception(f"Loan cannot be rejected from status '{loan.get('status')}'")
+    if loan.get("status") == "approved_by_lender":
+        # The lender was debited when funding; give the money back in the same commit
+        lender = txn.get_user(loan.get("lender_username"))
+        if not lender:
+            raise Exception("Lender not found")
+        lender["balance"] = util.safe_float(lender.get("balance")) + util.safe_float(loan.get("amount"))
+        txn.put_user(lender)
+    loan["status"] = "rejected"
+    loan["rejected_at"] = now
+
+def _apply_batch(loan_ids, transition):
+    """
+    Apply one state transition to many loans in a single transaction:
+    validate each id, mutate in memory (transition(txn, loan, now) may also
+    update related users), one commit. Returns (results,
+    changed_loans) where results has one {"id", "ok", "status"|"error"}
+    entry per requested id.
+    """
+    def _work(txn):
+        now = datetime.utcnow().isoformat()
+        results, changed, seen = [], [], set()
+        for loan_id in loan_ids:
+            if loan_id in seen:
+                continue
+            seen.add(loan_id)
+            loan = txn.get_loan(loan_id)
+            if loan is None:
+                results.append({"id": loan_id, "ok": False, "error": "Loan not found"})
+                continue
+            try:
+                transition(txn, loan, now)
+            except Exception as e:
+                results.append({"id": loan_id, "ok": False, "error": str(e)})
+                continue
+            txn.put_loan(loan)
+            changed.append(loan)
+            results.append({"id": loan_id, "ok": True, "status": loan["status"]})
+        return results, changed
+
+    return store.run_transaction(_work)
+
+def approve_loans(loan_ids):
+    """Finalize many lender-funded loans with a single commit."""
+    return _apply_batch(loan_ids, _approve_transition)
+
+def reject_loans(loan_ids):
+    """Reject many pending or lender-funded loans with a single commit."""
+    return _apply_batch(loan_ids, _reject_transition)
@@ -4,6 +4,7 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from backend import async_io
 
 class NotificationService:
     """Send notifications to users"""
@@ -23,20 +24,30 @@ class NotificationService:
         self.smtp_port = int(os.getenv('SMTP_PORT', 587))
         self.sender_email = os.getenv('SENDER_EMAIL', 'noreply@blockloan.com')
         self.sender_password = os.getenv('SENDER_PASSWORD', '')
+        # Plain-text sessions for local SMTP sinks (scripts/standins.py); keep TLS on for real servers
+        self.use_tls = os.getenv('SMTP_TLS', '1').lower() not in ('0', 'false', 'no')
+
+    def _build_message(self, recipient, subject, html_content):
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = self.sender_email
+        message["To"] = recipient
+        message.attach(MIMEText(html_content, "html"))
+        return message
 
     def send_email(self, recipient, subject, html_content):
         try:
             if not self.sender_password:
                 print(f"Email service not configured. Would send: {subject} to {recipient}")
                 return True
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = self.sender_email
-            message["To"] = recipient
-            part = MIMEText(html_content, "html")
-            message.attach(part)
+            if async_io.active():
+                # ASGI mode: the SMTP session runs on the event loop, not the request thread
+                async_io.submit(self.send_bulk_async([(recipient, subject, html_content)]))
+                return True
+            message = self._build_message(recipient, subject, html_content)
             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
+                if self.use_tls:
+                    server.starttls()
                 server.login(self.sender_email, self.sender_password)
                 server.sendmail(self.sender_email, recipient, message.as_string())
             print(f"Email sent to {recipient}")
@@ -45,6 +56,64 @@ class NotificationService:
             print(f"Error sending email: {e}")
             return False
 
+    def send_bulk(self, messages):
+        """Send (recipient, subject, html_content) tuples over one SMTP session."""
+        if not messages:
+            return 0
+        try:
+            if not self.sender_password:
+                for recipient, subject, _ in messages:
+                    print(f"Email service not configured. Would send: {subject} to {recipient}")
+                return len(messages)
+            if async_io.active():
+                async_io.submit(self.send_bulk_async(messages))
+                return len(messages)
+            sent = 0
+            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+                if self.use_tls:
+                    server.starttls()
+                server.login(self.sender_email, self.sender_password)
+                for recipient, subject, html_content in messages:
+                    message = self._build_message(recipient, subject, html_content)
+                    try:
+                        server.sendmail(self.sender_email, recipient, message.as_string())
+                        sent += 1
+                    except Exception as e:
+                        print(f"Error sending email to {recipient}: {e}")
+            print(f"Bulk email sent: {sent}/{len(messages)}")
+            return sent
+        except Exception as e:
+            print(f"Error sending bulk email: {e}")
+            return 0
+
+    async def send_bulk_async(self, messages):
+        """Non-blocking send_bulk for the event loop (one SMTP session)."""
+        try:
+            sent = await async_io.send_messages(
+                self.smtp_server, self.smtp_port, self.sender_email, self.sender_password,
+                [self._build_message(*m) for m in messages], use_tls=self.use_tls)
+            print(f"Bulk email sent: {sent}/{len(messages)}")
+            return sent
+        except Exception as e:
+            print(f"Error sending bulk email: {e}")
+            return 0
+
+    def notify_loan_decisions(self, loans, decision):
+        """Tell each borrower their loan was approved or rejected, as one batch."""
+        subject = f"Loan {decision.title()}"
+        messages = []
+        for loan in loans:
+            name = loan.get("borrower_username", "")
+            html_content = f"""
+        <html><body>
+            <h2>Loan {decision.title()}</h2>
+            <p>Hi {name},</p>
+            <p>Your loan of <strong>${float(loan.get("amount", 0)):,.2f}</strong> has been {decision}.</p>
+        </body></html>
+        """
+            messages.append((loan.get("borrower_email") or name, subject, html_content))
+        return self.send_bulk(messages)
+
     def notify_loan_requested(self, borrower_email, borrower_name, loan_amount):
         subject = "Loan Request Submitted"
         html_content = f"""
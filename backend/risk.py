@@ -0,0 +1,117 @@
+"""
+Per-borrower loan history and a simple risk score.
+
+History is a store aggregate ("borrower_stats", a keyed table in the store
+snapshot) updated from every loan state transition in the same commit, so
+reading a borrower's history is one snapshot lookup instead of a scan of the
+book. One entry per borrower:
+
+    "zun": {"taken": 3, "status": {"funded": 1, "rejected": 1, "pending": 1},
+            "open_due": {"<loan id>": "2026-11-29T11:14:21"}}
+
+Archiving a loan deletes it from the hot store but not from the history.
+"""
+from datetime import datetime, timedelta
+from backend import store, archive
+
+STATS_AGGREGATE = "borrower_stats"
+
+ACTIVE_STATUSES = ("approved_by_lender", "funded")
+
+
+# -----------------------------
+# Aggregate maintenance
+# -----------------------------
+def _due_date(loan):
+    try:
+        funded_at = datetime.fromisoformat(str(loan.get("funded_at")))
+        return (funded_at + timedelta(days=30 * int(loan.get("duration_months") or 0))).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+def _apply(data, old, new):
+    loan = new or old
+    borrower = loan.get("borrower_username")
+    if not borrower or new is None:
+        return False  # archival removes the hot copy, history stays
+    old_status = (old or {}).get("status")
+    if old is not None and old_status == new.get("status"):
+        return False
+
+    entry = data.setdefault(borrower, {"taken": 0, "status": {}, "open_due": {}})
+    if old is None:
+        entry["taken"] += 1
+    else:
+        remaining = entry["status"].get(old_status, 0) - 1
+        if remaining > 0:
+            entry["status"][old_status] = remaining
+        else:
+            entry["status"].pop(old_status, None)
+    entry["status"][new.get("status")] = entry["status"].get(new.get("status"), 0) + 1
+
+    due = _due_date(new) if new.get("status") in ACTIVE_STATUSES else None
+    if due:
+        entry["open_due"][new["id"]] = due
+    else:
+        entry["open_due"].pop(new.get("id"), None)
+    return True
+
+def _reduce(data, changes):
+    changed = False
+    for kind, old, new in changes:
+        if kind == "loan":
+            changed = _apply(data, old, new) or changed
+    return changed
+
+def _build(hot_loans):
+    data, hot_ids = {}, set()
+    for loan in hot_loans:
+        if loan.get("status") in archive.TERMINAL_STATUSES:
+            hot_ids.add(loan.get("id"))  # only these can also have an archived copy
+        _apply(data, None, loan)
+    for loan in archive.iter_archived_loans():
+        if loan.get("id") not in hot_ids:
+            _apply(data, None, loan)
+    return data
+
+def rebuild():
+    store.rebuild_aggregate(STATS_AGGREGATE)
+
+store.register_aggregate(STATS_AGGREGATE, _reduce, _build)
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def get_history(username):
+    entry = store.aggregate_get(STATS_AGGREGATE, username) or {"taken": 0, "status": {}, "open_due": {}}
+    now = datetime.utcnow().isoformat()
+    status = entry["status"]
+    return {
+        "taken": entry["taken"],
+        "repaid": status.get("repaid", 0) + status.get("completed", 0),
+        "rejected": status.get("rejected", 0),
+        "active": sum(status.get(s, 0) for s in ACTIVE_STATUSES),
+        "overdue": sum(1 for due in entry["open_due"].values() if due < now)
+    }
+
+def risk_score(history):
+    """0 (lowest risk) .. 100 (highest). Borrowers with no history start at 50."""
+    score = 50
+    score -= 10 * min(history["repaid"], 4)
+    score += 25 * history["overdue"]
+    score += 5 * min(history["rejected"], 4)
+    score += 5 * max(0, history["active"] - 2)
+    return max(0, min(100, score))
+
+def risk_grade(score):
+    if score < 35:
+        return "Low"
+    if score < 65:
+        return "Medium"
+    return "High"
+
+def get_risk(username):
+    history = get_history(username)
+    score = risk_score(history)
+    return {"score": score, "grade": risk_grade(score), "history": history}
@@ -0,0 +1,171 @@
+"""
+In-memory search over the pending-loan marketplace.
+
+An inverted index (token -> {loan_id: term frequency}) over loan descriptions
+plus sorted (value, loan_id) lists for amount and duration. The index is built
+once per process, then caught up from the store's loan change log (commits
+from any worker, user-only commits cost nothing), so queries never scan
+loans.json. Only pending loans are indexed — that's what lenders can fund.
+"""
+import re, math, bisect, heapq, threading
+from collections import Counter
+from operator import itemgetter
+from backend import store, util, risk
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "and", "the", "for", "to", "of", "in", "on", "my", "i", "is", "it", "with", "me", "be"}
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class LoanIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.postings = {}    # token -> {loan_id: tf}
+        self.docs = {}        # loan_id -> summary dict used for results
+        self.amounts = []     # sorted [(amount, loan_id)]
+        self.durations = []   # sorted [(duration_months, loan_id)]
+        self.generation = None
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+    def rebuild(self):
+        with self._lock:
+            self._reset()
+            txn = store.Transaction()
+            self.generation = txn.generation
+            for loan in txn.loans():
+                self._add(loan, keep_sorted=False)
+            self.amounts.sort()
+            self.durations.sort()
+
+    def _add(self, loan, keep_sorted=True):
+        if loan.get("status") != "pending" or loan.get("id") in self.docs:
+            return
+        loan_id = loan["id"]
+        amount = util.safe_float(loan.get("amount"))
+        try:
+            duration = int(loan.get("duration_months") or 0)
+        except (TypeError, ValueError):
+            duration = 0
+        tf = Counter(tokenize(loan.get("description")))
+        borrower = loan.get("borrower_username") or "N/A"
+        self.docs[loan_id] = {
+            "id": loan_id,
+            "borrower_anon_id": borrower[:2] + "****",
+            "borrower_username": borrower,
+            "amount": amount,
+            "duration_months": duration,
+            "description": loan.get("description"),
+            "created_at": loan.get("created_at"),
+            "tokens": tf
+        }
+        for token, count in tf.items():
+            self.postings.setdefault(token, {})[loan_id] = count
+        if keep_sorted:
+            bisect.insort(self.amounts, (amount, loan_id))
+            bisect.insort(self.durations, (duration, loan_id))
+        else:
+            self.amounts.append((amount, loan_id))
+            self.durations.append((duration, loan_id))
+
+    def _remove(self, loan_id):
+        doc = self.docs.pop(loan_id, None)
+        if not doc:
+            return
+        for token in doc["tokens"]:
+            ids = self.postings.get(token)
+            if ids is not None:
+                ids.pop(loan_id, None)
+                if not ids:
+                    del self.postings[token]
+        for values, key in ((self.amounts, doc["amount"]), (self.durations, doc["duration_months"])):
+            i = bisect.bisect_left(values, (key, loan_id))
+            if i < len(values) and values[i] == (key, loan_id):
+                del values[i]
+
+    def apply_changes(self, changes):
+        """Re-index every loan in (loan_id, new record or None) changes."""
+        for loan_id, new in changes:
+            self._remove(loan_id)
+            if new:
+                self._add(new)
+
+    def _ensure_current(self):
+        current = store.generation()
+        if self.generation == current:
+            return
+        changes = None if self.generation is None else store.loan_changes_since(self.generation, current)
+        if changes is None:
+            self.rebuild()  # first use, or the change log no longer reaches back far enough
+            return
+        self.apply_changes(changes)
+        self.generation = current
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _range(self, values, low, high):
+        lo = 0 if low is None else bisect.bisect_left(values, (low, ""))
+        hi = len(values) if high is None else bisect.bisect_right(values, (high, "\uffff"))
+        return {loan_id for _, loan_id in values[lo:hi]}
+
+    def search(self, q="", min_amount=None, max_amount=None, min_duration=None, max_duration=None,
+               page=1, per_page=20):
+        """Ranked (tf-idf) text match intersected with numeric ranges; newest first when no text."""
+        with self._lock:
+            self._ensure_current()
+            candidates = None
+            if min_amount is not None or max_amount is not None:
+                candidates = self._range(self.amounts, min_amount, max_amount)
+            if min_duration is not None or max_duration is not None:
+                ids = self._range(self.durations, min_duration, max_duration)
+                candidates = ids if candidates is None else candidates & ids
+
+            terms = tokenize(q)
+            scores = {}
+            page, per_page = max(1, int(page or 1)), max(1, int(per_page or 20))
+            if terms:
+                n_docs = len(self.docs) or 1
+                for term in set(terms):
+                    postings = self.postings.get(term, {})
+                    if not postings:
+                        continue
+                    idf = math.log(n_docs / len(postings)) + 1.0
+                    weights = {}
+                    get = scores.get
+                    for loan_id, tf in postings.items():
+                        if candidates is None or loan_id in candidates:
+                            w = weights.get(tf)
+                            if w is None:
+                                w = weights[tf] = (1 + math.log(tf)) * idf
+                            scores[loan_id] = get(loan_id, 0.0) + w
+                # Only rank as far as the requested page instead of sorting every match
+                top = [i for i, _ in heapq.nlargest(page * per_page, scores.items(), key=itemgetter(1))]
+                total = len(scores)
+            else:
+                pool = self.docs if candidates is None else candidates
+                created = {i: self.docs[i]["created_at"] or "" for i in pool}
+                top = heapq.nlargest(page * per_page, created, key=created.__getitem__)
+                total = len(pool)
+
+            page_data = {"page": page, "per_page": per_page, "total": total,
+                         "pages": max(1, (total + per_page - 1) // per_page)}
+            results = []
+            for loan_id in top[(page - 1) * per_page:]:
+                doc = self.docs[loan_id]
+                result = {k: v for k, v in doc.items() if k not in ("tokens", "borrower_username")}
+                result["risk"] = risk.get_risk(doc["borrower_username"])
+                if terms:
+                    result["score"] = round(scores[loan_id], 4)
+                results.append(result)
+            page_data["items"] = results
+            return page_data
+
+
+loan_index = LoanIndex()
@@ -0,0 +1,395 @@
+"""
+Read-only, memory-mapped snapshot of the loan and user tables.
+
+Every store commit publishes data/.snapshots/gen-<generation>.snap and then
+points data/.store_meta.json at that generation. Workers map the file named
+by the latest generation and look records up in place — a binary search
+over a sorted hash index, then one json.loads of that record — so no worker
+parses or holds its own copy of loans.json/users.json, and the mapped pages
+are shared through the OS page cache however many workers there are.
+Store aggregates (e.g. per-borrower history) are further tables of
+{"key", "value"} records, looked up the same way.
+
+Layout:
+    MAGIC | u32 header length | header JSON (generation, id counters, per-table
+                                counts by status/role, array positions)
+    per table: order array   (key hash, offset, length, field hashes...) in file order
+               lookup array  (key hash, offset, length) sorted by key hash
+               one lookup array per INDEX_FIELDS field, sorted by that field's hash
+    per table: record bytes, stored exactly as they appear inside
+               loans.json/users.json, so a commit writes both files by copying
+               unchanged records byte for byte; offsets are relative to the
+               table's record bytes, so a table a commit leaves alone (users on
+               a loan-only commit, an untouched aggregate) is copied in two slices
+"""
+import os, sys, json, mmap, struct, hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+
+snapshot_dir = "data/.snapshots"
+
+MAGIC = b"MLSNAP04"
+KEEP_GENERATIONS = 3  # older files stay mapped by in-flight readers for a moment
+KEY_FIELDS = {"loan": "id", "user": "username"}  # any other table is a store aggregate: {"key", "value"}
+INDEX_FIELDS = {"loan": ("borrower_username", "lender_username", "status"), "user": ("role",)}
+COUNT_FIELDS = {"loan": "status", "user": "role"}
+PATCH_LIMIT = 256  # changed records beyond which a commit rebuilds a table instead of patching it
+
+def key_field(kind):
+    return KEY_FIELDS.get(kind, "key")
+
+_HEADER_LEN = struct.Struct("<I")
+_ENTRY = struct.Struct("<QQQ")  # key hash, offset, length
+_HASH = struct.Struct("<Q")
+
+
+def key_hash(key):
+    return _HASH.unpack(hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest())[0]
+
+def field_hashes(kind, record):
+    return tuple(key_hash(record.get(field)) for field in INDEX_FIELDS.get(kind, ()))
+
+def count_change(counts, kind, old, new):
+    """Apply one (old, new) record change to a table's {value: count} dict."""
+    field = COUNT_FIELDS[kind]
+    if old is not None:
+        value = str(old.get(field))
+        counts[value] = counts.get(value, 0) - 1
+        if counts[value] <= 0:
+            del counts[value]
+    if new is not None:
+        value = str(new.get(field))
+        counts[value] = counts.get(value, 0) + 1
+
+def element(record):
+    """A record as it appears inside the indent=2 JSON array files."""
+    text = json.dumps(record, indent=2, ensure_ascii=False)
+    return ("  " + text.replace("\n", "\n  ")).encode("utf-8")
+
+def render_array(elements):
+    """Join element bytes into exactly what json.dumps(records, indent=2) would produce."""
+    elements = list(elements)
+    if not elements:
+        return b"[]"
+    return b"[\n" + b",\n".join(elements) + b"\n]"
+
+def path_for(generation):
+    return os.path.join(snapshot_dir, f"gen-{generation:012d}.snap")
+
+
+# -----------------------------
+# Writing
+# -----------------------------
+def _rows(raw):
+    """Little-endian u64 rows as a native array."""
+    rows = array("Q")
+    rows.frombytes(raw)
+    if sys.byteorder == "big":
+        rows.byteswap()
+    return rows
+
+def _tobytes(rows):
+    if sys.byteorder == "big":
+        rows = array("Q", rows)
+        rows.byteswap()
+    return rows.tobytes()
+
+def _pack(columns):
+    """Interleave equal-length columns of u64s into little-endian rows."""
+    width = len(columns)
+    rows = array("Q", bytes(8 * width * len(columns[0])))
+    for i, column in enumerate(columns):
+        rows[i::width] = array("Q", column)
+    return _tobytes(rows)
+
+def _index_size(kind, count):
+    fields = len(INDEX_FIELDS.get(kind, ()))
+    return 8 * (3 + fields) * count + _ENTRY.size * (1 + fields) * count
+
+class Table:
+    """One table ready for write(): its packed arrays, then its record bytes (what the offsets are relative to)."""
+    def __init__(self, kind, count, index, data):
+        self.kind, self.count, self.index, self.data = kind, count, index, data
+
+    def elements(self):
+        """Record bytes in file order."""
+        width = 3 + len(INDEX_FIELDS.get(self.kind, ()))
+        rows = _rows(self.index[:8 * width * self.count])
+        return [self.data[offset:offset + length] for offset, length in zip(rows[1::width], rows[2::width])]
+
+def build_table(kind, entries):
+    """A Table from a list of (key hash, element bytes, field hashes) in file order."""
+    keys, offsets, lengths, data_parts, position = [], [], [], [], 0
+    for h, raw, _ in entries:
+        keys.append(h)
+        offsets.append(position)
+        lengths.append(len(raw))
+        data_parts.append(raw)
+        position += len(raw)
+    fields = [[e[2][i] for e in entries] for i in range(len(INDEX_FIELDS.get(kind, ())))]
+    index_parts = [_pack([keys, offsets, lengths] + fields)]
+    for column in [keys] + fields:
+        # Stable sort by hash alone: equal hashes stay in file (offset) order
+        ranked = sorted(range(len(column)), key=column.__getitem__)
+        index_parts.append(_pack([[column[i] for i in ranked], [offsets[i] for i in ranked],
+                                  [lengths[i] for i in ranked]]))
+    return Table(kind, len(entries), b"".join(index_parts), b"".join(data_parts))
+
+def _patch_sorted(rows, removed, inserted, points, shifts):
+    """
+    Edit a (hash, offset, length) array sorted by hash then offset: drop the
+    `removed` (hash, old offset) entries, move the rest by the shift in
+    effect at their old offset, and add the `inserted` rows in place.
+    """
+    keys, drop = rows[0::3], []
+    for h, offset in removed:
+        i = bisect_left(keys, h)
+        while rows[3 * i + 1] != offset:
+            i += 1
+        drop.append(i)
+    kept, prev = array("Q"), 0
+    for i in sorted(drop):
+        kept.extend(rows[3 * prev:3 * i])
+        prev = i + 1
+    kept.extend(rows[3 * prev:])
+    if len(points) == 1 and shifts[1]:  # the usual one-record commit: a comparison, not a bisect, per row
+        point, shift = points[0], shifts[1]
+        kept[1::3] = array("Q", [o + shift if o > point else o for o in kept[1::3]])
+    elif any(shifts):
+        kept[1::3] = array("Q", [o + shifts[bisect_right(points, o)] for o in kept[1::3]])
+    keys, offsets, positions = kept[0::3], kept[1::3], []
+    for h, offset, length in inserted:
+        i = bisect_left(keys, h)
+        while i < len(keys) and keys[i] == h and offsets[i] < offset:
+            i += 1
+        positions.append((i, h, offset, length))
+    for i, h, offset, length in sorted(positions, reverse=True):  # back to front keeps positions valid
+        kept[3 * i:3 * i] = array("Q", [h, offset, length])
+    return kept
+
+def write(generation, committed_at, tables, counts, counters=None):
+    """
+    Publish the snapshot file for `generation` and return its path. tables maps
+    each table name to a Table, or to a list of (key hash, element bytes, field
+    hashes) in file order; counts maps them to {COUNT_FIELDS value: records};
+    counters are the store's id counters, e.g. {"user": 41}.
+    """
+    header = {"generation": generation, "committed_at": committed_at, "counters": counters or {}, "tables": {}}
+    index_parts, data_parts = [], []
+    for kind, table in tables.items():
+        if not isinstance(table, Table):
+            table = build_table(kind, table)
+        header["tables"][kind] = {"count": table.count, "counts": counts.get(kind, {}), "data_size": len(table.data)}
+        index_parts.append(table.index)
+        data_parts.append(table.data)
+    offset = 0
+    for kind, table in header["tables"].items():
+        table["order"] = offset
+        offset += 8 * (3 + len(INDEX_FIELDS.get(kind, ()))) * table["count"]
+        table["lookup"] = offset
+        offset += _ENTRY.size * table["count"]
+        table["by"] = {}
+        for field in INDEX_FIELDS.get(kind, ()):
+            table["by"][field] = offset
+            offset += _ENTRY.size * table["count"]
+    for table, data in zip(header["tables"].values(), data_parts):
+        table["data"] = offset
+        offset += len(data)
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    # Positions in the header are relative to the end of the header; record offsets to the table's record bytes
+    blob = b"".join([MAGIC, _HEADER_LEN.pack(len(header_bytes)), header_bytes] + index_parts + data_parts)
+
+    path = path_for(generation)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+def prune(current_generation):
+    """Delete snapshot files more than KEEP_GENERATIONS behind (ignores ones still open on Windows)."""
+    try:
+        names = os.listdir(snapshot_dir)
+    except OSError:
+        return
+    for name in names:
+        if not (name.startswith("gen-") and name.endswith(".snap")):
+            continue
+        try:
+            if int(name[4:-5]) <= current_generation - KEEP_GENERATIONS:
+                os.remove(os.path.join(snapshot_dir, name))
+        except (ValueError, OSError):
+            pass
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def readable(path):
+    """True if `path` is a snapshot file in the current format."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+class Snapshot:
+    """One mapped generation. Cheap to share between threads; the mapping closes with the last reference."""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a store snapshot")
+        header_len = _HEADER_LEN.unpack_from(self._mm, len(MAGIC))[0]
+        base = len(MAGIC) + _HEADER_LEN.size
+        header = json.loads(self._mm[base:base + header_len])
+        self._base = base + header_len
+        self.path = path
+        self.generation = header["generation"]
+        self.committed_at = header.get("committed_at")
+        self.counters = header.get("counters", {})
+        self.tables = header["tables"]
+
+    def has(self, kind):
+        return kind in self.tables
+
+    def count(self, kind):
+        return self.tables[kind]["count"] if kind in self.tables else 0
+
+    def counts(self, kind):
+        """Records per COUNT_FIELDS value, e.g. {"pending": 12, "funded": 3} (a copy)."""
+        return dict(self.tables[kind]["counts"]) if kind in self.tables else {}
+
+    def read(self, offset, length):
+        return self._mm[offset:offset + length]
+
+    def table(self, kind, changes=None):
+        """
+        This snapshot's `kind` table with `changes` ({key: record, or None to
+        delete}) applied, as a Table for write(). Untouched records keep their
+        bytes and place and only their offsets move; changed records are
+        rewritten where they stand and new ones appended, so a small commit
+        costs a copy and a few array edits rather than a re-sort.
+        """
+        table = self.tables[kind]
+        fields = INDEX_FIELDS.get(kind, ())
+        width, count = 3 + len(fields), table["count"]
+        start, data_start = self._base + table["order"], self._base + table["data"]
+        index = self._mm[start:start + _index_size(kind, count)]
+        data = self._mm[data_start:data_start + table["data_size"]]
+        if not changes:
+            return Table(kind, count, index, data)
+
+        order = _rows(index[:8 * width * count])
+        row_offsets = order[1::width]  # ascending: the order array is in file order
+        edits, appended = [], []  # (row in file order, new entry or None); new keys
+        for key, record in changes.items():
+            h = key_hash(key)
+            new = None if record is None else (h, element(record), field_hashes(kind, record))
+            old = next(self._matches(table, self._base + table["lookup"], key_field(kind), key), None)
+            if old is not None:
+                edits.append((bisect_left(row_offsets, old[0]), new))
+            elif new is not None:
+                appended.append(new)
+        edits.sort(key=lambda edit: edit[0])
+
+        new_order, data_parts = array("Q"), []
+        removed, inserted = [], []  # per sorted array: (hash, old offset) and (hash, offset, length)
+        points, shifts = [], [0]  # old offsets where the shift changes; the shift from there on
+        prev, position, shift = 0, 0, 0
+        for row, new in edits + [(count, None)]:
+            segment = order[prev * width:row * width]
+            if shift:
+                segment[1::width] = array("Q", [o + shift for o in segment[1::width]])
+            new_order.extend(segment)
+            if row == count:
+                break
+            old = order[row * width:(row + 1) * width]
+            data_parts.append(data[position:old[1]])
+            removed.append([(old[0], old[1])] + [(hash_, old[1]) for hash_ in old[3:]])
+            if new is not None:
+                h, raw, hashes = new
+                new_order.extend(array("Q", (h, old[1] + shift, len(raw)) + hashes))
+                inserted.append([(h, old[1] + shift, len(raw))] + [(hash_, old[1] + shift, len(raw)) for hash_ in hashes])
+                data_parts.append(raw)
+            shift += (len(raw) if new is not None else 0) - old[2]
+            points.append(old[1])
+            shifts.append(shift)
+            prev, position = row + 1, old[1] + old[2]
+        data_parts.append(data[position:])
+        position = len(data) + shift
+        for h, raw, hashes in appended:
+            new_order.extend(array("Q", (h, position, len(raw)) + hashes))
+            inserted.append([(h, position, len(raw))] + [(hash_, position, len(raw)) for hash_ in hashes])
+            data_parts.append(raw)
+            position += len(raw)
+
+        index_parts = [_tobytes(new_order)]
+        sorted_start = 8 * width * count
+        for i in range(1 + len(fields)):
+            rows = _rows(index[sorted_start + i * _ENTRY.size * count:sorted_start + (i + 1) * _ENTRY.size * count])
+            index_parts.append(_tobytes(_patch_sorted(rows, [r[i] for r in removed], [r[i] for r in inserted],
+                                                      points, shifts)))
+        return Table(kind, len(new_order) // width, b"".join(index_parts), b"".join(data_parts))
+
+    def entries(self, kind):
+        """(key hash, offset, length, field hashes) for each record, in file order."""
+        if kind not in self.tables:
+            return
+        table = self.tables[kind]
+        width = 3 + len(INDEX_FIELDS.get(kind, ()))
+        start, data = self._base + table["order"], self._base + table["data"]
+        end = start + 8 * width * table["count"]
+        step = 8 * width * 4096  # decoded a block at a time
+        for block in range(start, end, step):
+            rows = array("Q")
+            rows.frombytes(self._mm[block:min(block + step, end)])
+            if sys.byteorder == "big":
+                rows.byteswap()
+            columns = [rows[i::width] for i in range(width)]
+            hashes = zip(*columns[3:]) if width > 3 else repeat(())
+            offsets = (offset + data for offset in columns[1])
+            yield from zip(columns[0], offsets, columns[2], hashes)
+
+    def records(self, kind):
+        """Parse records one at a time, in file order."""
+        for _, offset, length, _ in self.entries(kind):
+            yield json.loads(self._mm[offset:offset + length])
+
+    def _matches(self, table, start, field, value):
+        """(offset, record) for records in a hash-sorted array of `table` whose `field` equals `value`, in file order."""
+        data, count = self._base + table["data"], table["count"]
+        h = key_hash(value)
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _HASH.unpack_from(self._mm, start + mid * _ENTRY.size)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < count:
+            entry_hash, offset, length = _ENTRY.unpack_from(self._mm, start + lo * _ENTRY.size)
+            if entry_hash != h:
+                break
+            record = json.loads(self._mm[data + offset:data + offset + length])
+            if record.get(field) == value:  # else a 64-bit hash collision
+                yield offset, record
+            lo += 1
+
+    def get(self, kind, key):
+        """The record with this key (freshly parsed), or None."""
+        if kind not in self.tables:
+            return None
+        table = self.tables[kind]
+        match = next(self._matches(table, self._base + table["lookup"], key_field(kind), key), None)
+        return match and match[1]
+
+    def find(self, kind, field, value):
+        """Records whose INDEX_FIELDS `field` equals `value` (freshly parsed), in file order."""
+        table = self.tables[kind]
+        return [record for _, record in self._matches(table, self._base + table["by"][field], field, value)]
@@ -0,0 +1,675 @@
+"""
+Transactional store over data/loans.json and data/users.json.
+
+Every write to loans or users should go through `run_transaction`:
+
+    def _work(txn):
+        loan = txn.get_loan(loan_id)
+        lender = txn.get_user(username)
+        ...
+        txn.put_loan(loan)
+        txn.put_user(lender)
+        return loan
+    store.run_transaction(_work)
+
+- Optimistic concurrency: each record carries a "version". A put is rejected
+  with TransactionConflict if the stored version moved since the record was
+  read; run_transaction retries the whole function on conflict.
+- Crash-safe commit: the new contents of every touched file are written to a
+  journal and fsync'ed first, then each file is replaced atomically
+  (temp file + rename). A journal left behind by a crash or a failed write is
+  replayed before anything else touches the files (the next commit in any
+  process, or `recover()`), so loans and users never disagree.
+- Aggregates: derived keyed tables (e.g. per-borrower history) registered
+  with `register_aggregate` live in the snapshot next to loans and users.
+  Each commit copies out and updates only the entries its loan changes touch,
+  and publishes them in the same generation, so they can never drift from
+  the records they summarise; readers look one entry up in the mapping.
+- Id counters: `txn.next_id("user")` claims the next id, version-checked
+  like a record write, so concurrent transactions never hand out the same one.
+- Shared reads: each commit also publishes a memory-mapped snapshot of both
+  tables (backend/snapshot.py) and bumps the generation in the meta file.
+  Readers in every worker map the latest generation and parse only the
+  records they touch, instead of each holding a parsed copy of both files.
+  Edits made to the JSON files outside the store are picked up at the next
+  commit or restart.
+- Group commit: concurrent transactions in a process queue up; whichever
+  thread gets the commit lock writes them all in one journal + file swap,
+  so N concurrent fundings cost one round of fsyncs instead of N.
+  An OS file lock serialises commits across worker processes.
+"""
+import os, json, copy, threading, time
+from datetime import datetime
+from backend import util, snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+loans_file = "data/loans.json"
+users_file = "data/users.json"
+journal_file = "data/.commit.journal"
+meta_file = "data/.store_meta.json"
+lock_file = "data/.store.lock"
+changes_file = "data/.loan_changes.ndjson"
+
+MAX_RETRIES = 5
+CHANGE_LOG_BYTES = 8 * 1024 * 1024  # the log restarts past this; readers further behind rebuild
+
+
+class TransactionConflict(Exception):
+    """A record changed between read and commit."""
+
+
+# -----------------------------
+# Cross-process lock
+# -----------------------------
+class FileLock:
+    def __init__(self, path=None, blocking=True):
+        self.path = path or lock_file
+        self.blocking = blocking
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._f = open(self.path, "a+")
+        try:
+            if fcntl:
+                flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(self._f.fileno(), flags)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            # Non-blocking and someone else holds it
+            self._f.close()
+            raise BlockingIOError(f"{self.path} is locked")
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._f.close()
+
+
+# -----------------------------
+# Committed state: mapped snapshot
+# -----------------------------
+_aggregates = {}  # name -> (reducer(data, changes), build(loans))
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _source_stamps():
+    return {path: _file_stamp(path) for path in (loans_file, users_file)}
+
+class _State:
+    """
+    What this worker knows about the last commit: the mapped snapshot of the
+    generation named in the meta file (re-opened only when the meta file
+    changes).
+    """
+    def __init__(self):
+        self.meta_stamp = None
+        self.meta = {}
+        self.snap = None
+
+    def refresh(self):
+        """False when the snapshot for the current generation has to be (re)built first."""
+        stamp = _file_stamp(meta_file)
+        if stamp != self.meta_stamp or self.snap is None:
+            meta = _read_meta()
+            path = snapshot.path_for(meta.get("generation", 0))
+            if self.snap is None or self.snap.path != path:
+                try:
+                    self.snap = snapshot.Snapshot(path)
+                except (OSError, ValueError):
+                    return False
+            self.meta, self.meta_stamp = meta, stamp
+        return True
+
+_state = _State()
+_state_lock = threading.Lock()
+
+def _read_meta():
+    try:
+        with open(meta_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _current():
+    with _state_lock:
+        if _state.refresh():
+            return _state.snap
+    ensure_snapshot()
+    with _state_lock:
+        if not _state.refresh():
+            raise Exception("store snapshot could not be loaded")
+        return _state.snap
+
+def generation():
+    """Monotonic commit counter shared by all workers (bumped on every group commit)."""
+    return _current().generation
+
+def last_commit_time():
+    return _current().committed_at
+
+def read_loan(loan_id):
+    """Committed loan by id (a copy), without opening a transaction."""
+    return _current().get("loan", loan_id)
+
+def read_user(username):
+    """Committed user by username (a copy), without opening a transaction."""
+    return _current().get("user", username)
+
+def find_loans(field, value):
+    """Committed loans whose borrower_username, lender_username or status equals `value`."""
+    return _current().find("loan", field, value)
+
+def counts(kind):
+    """Committed loans by status ("loan") or users by role ("user"), e.g. {"pending": 12}."""
+    return _current().counts(kind)
+
+def register_aggregate(name, reducer, build):
+    """
+    Maintain a derived keyed table `name` in the snapshot.
+
+    reducer(data, changes) gets each commit's loan changes as (kind, old, new)
+    and updates entries through data.setdefault(key, default), which copies
+    only that entry out of the snapshot, or data[key] = value; it returns True
+    if anything changed.
+    build(loans) returns the whole table as {key: value} from every hot loan;
+    it runs under the commit lock whenever the table is missing (first run, a
+    snapshot rebuilt from the files, or a commit by a process that doesn't
+    maintain this aggregate).
+    """
+    _aggregates[name] = (reducer, build)
+
+def aggregate_get(name, key):
+    """Committed value of one aggregate entry (a copy), or None."""
+    record = _aggregate_snapshot(name).get(name, key)
+    return record["value"] if record else None
+
+def aggregate_items(name):
+    """(key, value) for every entry of an aggregate, parsed one at a time."""
+    for record in _aggregate_snapshot(name).records(name):
+        yield record["key"], record["value"]
+
+def _aggregate_snapshot(name):
+    snap = _current()
+    if not snap.has(name) and name in _aggregates:
+        rebuild_aggregate(name)
+        snap = _current()
+    return snap
+
+def rebuild_aggregate(name):
+    """Recompute a registered aggregate from scratch and publish it as a new generation."""
+    _current()  # builds the snapshot first if needed (that takes the commit lock itself)
+    with _commit_lock:
+        _commit_group([], rebuild={name})
+
+
+# -----------------------------
+# Snapshot publishing
+# -----------------------------
+def ensure_snapshot():
+    """
+    Make sure the snapshot matches loans.json/users.json: build it on first run,
+    after a recovered crash, or when the files were edited outside the store
+    (which also bumps the generation so caches notice).
+    """
+    with _commit_lock, FileLock():
+        _ensure_snapshot_locked()
+
+def _ensure_snapshot_locked():
+    _replay_journal_locked()  # never build on half-written files
+    meta = _read_meta()
+    path = snapshot.path_for(meta.get("generation", 0))
+    if meta.get("sources") == _jsonable(_source_stamps()) and snapshot.readable(path):
+        return False
+    tables, counts, counters = {}, {}, {}
+    for kind, source in (("loan", loans_file), ("user", users_file)):
+        field = snapshot.KEY_FIELDS[kind]
+        records = util.read_json(source) or []
+        tables[kind] = [(snapshot.key_hash(r.get(field)), snapshot.element(r), snapshot.field_hashes(kind, r))
+                        for r in records]
+        counts[kind] = {}
+        for r in records:
+            snapshot.count_change(counts[kind], kind, None, r)
+        if kind == "loan":
+            for name, (_, build) in _aggregates.items():
+                tables[name] = _aggregate_elements(build(records))
+        else:
+            # Files edited outside the store: resume the id counter after the highest id on file
+            counters["user"] = max([r["id"] for r in records if isinstance(r.get("id"), int)] + [0])
+    generation = meta.get("generation", 0) + 1
+    committed_at = meta.get("committed_at") or datetime.utcnow().isoformat()
+    snapshot.write(generation, committed_at, tables, counts, counters)
+    _write_meta({"generation": generation, "committed_at": committed_at})
+    with _state_lock:
+        _state.meta_stamp = None
+    print(f"[store] rebuilt snapshot at generation {generation}")
+    return True
+
+def _aggregate_elements(data):
+    return [(snapshot.key_hash(key), snapshot.element({"key": key, "value": value}), ())
+            for key, value in data.items()]
+
+def _jsonable(stamps):
+    return {path: list(stamp) if stamp else None for path, stamp in stamps.items()}
+
+def _write_meta(meta):
+    # Written last in every commit; records which file versions the snapshot mirrors
+    util.write_file_atomic(meta_file, json.dumps(dict(meta, sources=_jsonable(_source_stamps()))))
+
+
+class _Overlay:
+    """A table as seen by a commit: the mapped snapshot plus this group's writes."""
+    def __init__(self, snap, kind):
+        self.snap = snap
+        self.kind = kind
+        self.changes = {}  # key -> record, or None when deleted
+
+    def get(self, key, default=None):
+        record = self.changes[key] if key in self.changes else self.snap.get(self.kind, key)
+        return default if record is None else record
+
+    def __setitem__(self, key, record):
+        self.changes[key] = record
+
+    def pop(self, key, default=None):
+        self.changes[key] = None
+
+    def elements(self):
+        """
+        (key hash, element bytes, field hashes) in file order; unchanged
+        records are copied, not re-serialised.
+        """
+        pending = dict(self.changes)
+        changed = {snapshot.key_hash(key) for key in pending}
+        field = snapshot.key_field(self.kind)
+        result = []
+        for h, offset, length, hashes in self.snap.entries(self.kind):
+            raw = self.snap.read(offset, length)
+            if h in changed:
+                key = json.loads(raw).get(field)
+                if key in pending:
+                    record = pending.pop(key)
+                    if record is not None:
+                        result.append((h, snapshot.element(record), snapshot.field_hashes(self.kind, record)))
+                    continue
+            result.append((h, raw, hashes))
+        for key, record in pending.items():
+            if record is not None:
+                result.append((snapshot.key_hash(key), snapshot.element(record),
+                               snapshot.field_hashes(self.kind, record)))
+        return result
+
+    def table(self):
+        """The table for snapshot.write: the old one patched if this commit touched little of it, else rebuilt."""
+        if self.snap.has(self.kind) and len(self.changes) <= snapshot.PATCH_LIMIT:
+            return self.snap.table(self.kind, self.changes)
+        return snapshot.build_table(self.kind, self.elements())
+
+
+class _AggregateOverlay(_Overlay):
+    """An aggregate as seen by a commit's reducer: entries are copied out of the snapshot on first touch."""
+    def setdefault(self, key, default):
+        record = self.get(key)  # parsed fresh from the mapping, or already copied by this commit
+        if record is None:
+            record = {"key": key, "value": default}
+        self.changes[key] = record
+        return record["value"]
+
+    def __setitem__(self, key, value):
+        self.changes[key] = {"key": key, "value": value}
+
+
+# -----------------------------
+# Transactions
+# -----------------------------
+class Transaction:
+    def __init__(self):
+        self._snap = _current()  # every read in the transaction sees this generation
+        self.generation = self._snap.generation
+        self.writes = []  # (kind, key, record or None, expected_version, insert)
+        self._latest = {}  # (kind, key) -> record as last written in this transaction
+
+    def get_loan(self, loan_id):
+        return self._pending("loan", loan_id)
+
+    def get_user(self, username):
+        return self._pending("user", username)
+
+    def _pending(self, kind, key):
+        if (kind, key) in self._latest:
+            record = self._latest[(kind, key)]
+            return copy.deepcopy(record) if record else None
+        return self._snap.get(kind, key)  # parsed fresh from the mapping: already a private copy
+
+    def _write(self, kind, key, record, expected, insert):
+        self.writes.append((kind, key, record, expected, insert))
+        self._latest[(kind, key)] = record
+
+    def loans(self):
+        """Committed loans as of the snapshot, parsed one at a time (use get_loan before modifying)."""
+        return self._snap.records("loan")
+
+    def users(self):
+        """Committed users as of the snapshot, parsed one at a time (use get_user before modifying)."""
+        return self._snap.records("user")
+
+    def find_loans(self, field, value):
+        """Loans as of the snapshot whose INDEX_FIELDS `field` equals `value` (an index lookup)."""
+        return self._snap.find("loan", field, value)
+
+    def find_users(self, field, value):
+        """Users as of the snapshot whose INDEX_FIELDS `field` (role) equals `value` (an index lookup)."""
+        return self._snap.find("user", field, value)
+
+    def next_id(self, name):
+        """
+        Claim the next value of id counter `name` (e.g. "user"). Transactions
+        that claim the same value conflict at commit, so a retry gets a fresh one.
+        """
+        value = self._latest.get(("counter", name), self._snap.counters.get(name, 0)) + 1
+        self._write("counter", name, value, value - 1, False)
+        return value
+
+    def put_loan(self, loan, insert=False):
+        self._write("loan", loan.get("id"), copy.deepcopy(loan), loan.get("version", 0), insert)
+
+    def put_user(self, user, insert=False):
+        self._write("user", user.get("username"), copy.deepcopy(user), user.get("version", 0), insert)
+
+    def delete_loan(self, loan):
+        self._write("loan", loan.get("id"), None, loan.get("version", 0), False)
+
+    def delete_user(self, user):
+        self._write("user", user.get("username"), None, user.get("version", 0), False)
+
+
+class _Request:
+    def __init__(self, txn):
+        self.txn = txn
+        self.done = threading.Event()
+        self.error = None
+        self.changes = []
+
+_queue = []
+_queue_lock = threading.Lock()
+_commit_lock = threading.Lock()
+
+def commit(txn):
+    if not txn.writes:
+        return []
+    req = _Request(txn)
+    with _queue_lock:
+        _queue.append(req)
+    with _commit_lock:
+        if not req.done.is_set():
+            with _queue_lock:
+                batch = _queue[:]
+                del _queue[:]
+            _commit_group(batch)
+    if req.error:
+        raise req.error
+    return req.changes
+
+def run_transaction(work, retries=MAX_RETRIES):
+    """Run work(txn) and commit it, retrying from a fresh snapshot on version conflicts."""
+    for attempt in range(retries):
+        txn = Transaction()
+        result = work(txn)
+        try:
+            commit(txn)
+            return result
+        except TransactionConflict:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.001 * (attempt + 1))
+
+
+def _apply(txn, loans, users, counters):
+    """Validate and apply one transaction to the working dicts; returns its changes."""
+    staged = {"loan": dict(), "user": dict(), "counter": dict()}
+    changes = []
+    for kind, key, record, expected, insert in txn.writes:
+        if kind == "counter":
+            if staged[kind].get(key, counters.get(key, 0)) != expected:
+                raise TransactionConflict(f"{key} id {expected + 1} was claimed concurrently")
+            staged[kind][key] = record
+            continue
+        table = loans if kind == "loan" else users
+        current = staged[kind].get(key, table.get(key))
+        if key is None:
+            raise TransactionConflict(f"{kind} record without a key")
+        if insert and current is not None:
+            raise TransactionConflict(f"{kind} '{key}' already exists")
+        if not insert and key not in staged[kind] and (current or {}).get("version", 0) != expected:
+            raise TransactionConflict(f"{kind} '{key}' was modified concurrently")
+        if record is not None:
+            record["version"] = (table.get(key) or {}).get("version", 0) + 1
+        staged[kind][key] = record
+        changes.append((kind, current, record))
+    counters.update(staged["counter"])
+    for kind, table in (("loan", loans), ("user", users)):
+        for key, record in staged[kind].items():
+            if record is None:
+                table.pop(key, None)
+            else:
+                table[key] = record
+    return changes
+
+def _commit_group(batch, rebuild=()):
+    try:
+        with FileLock():
+            _ensure_snapshot_locked()  # picks up edits made outside the store
+            with _state_lock:
+                _state.refresh()
+                snap = _state.snap
+            loans, users, counters = _Overlay(snap, "loan"), _Overlay(snap, "user"), dict(snap.counters)
+            touched, committed = set(), []
+            for req in batch:
+                try:
+                    req.changes = _apply(req.txn, loans, users, counters)
+                    touched.update(kind for kind, _, _ in req.changes)
+                    committed.append(req)
+                except TransactionConflict as e:
+                    req.error = e
+            # Aggregates this process maintains but the snapshot lacks are built from scratch
+            missing = {name for name in _aggregates if name in rebuild or not snap.has(name)}
+            if committed or missing:
+                tables = {"loan": loans.table(), "user": users.table()}
+                files = {}
+                if "loan" in touched:
+                    files[loans_file] = snapshot.render_array(tables["loan"].elements()).decode("utf-8")
+                if "user" in touched:
+                    files[users_file] = snapshot.render_array(tables["user"].elements()).decode("utf-8")
+                all_changes = [c for req in committed for c in req.changes]
+                counts = {kind: snap.counts(kind) for kind in tables}
+                for kind, old, new in all_changes:
+                    snapshot.count_change(counts[kind], kind, old, new)
+                loan_changes = [c for c in all_changes if c[0] == "loan"]
+                for name, (reducer, build) in _aggregates.items():
+                    if name in missing:
+                        tables[name] = _aggregate_elements(build(json.loads(raw) for raw in tables["loan"].elements()))
+                        continue
+                    data = _AggregateOverlay(snap, name)
+                    if loan_changes and not reducer(data, loan_changes):
+                        data.changes.clear()
+                    tables[name] = data.table()  # untouched entries are copied byte for byte
+                # Aggregates only follow loans: ones another process maintains survive a commit without loan changes
+                for name in snap.tables:
+                    if name not in tables and name not in snapshot.KEY_FIELDS and not loan_changes:
+                        tables[name] = snap.table(name)
+                meta = {"generation": snap.generation + 1, "committed_at": datetime.utcnow().isoformat()}
+                # The new generation's snapshot goes out before the meta file points at it
+                new_snap = snapshot.Snapshot(snapshot.write(
+                    meta["generation"], meta["committed_at"], tables, counts, counters))
+                # Logged before the commit so a reader never sees a generation without its line;
+                # a line from a commit that then fails is superseded by the next one for that generation
+                _log_loan_changes(meta["generation"], all_changes)
+                try:
+                    _durable_write(files, meta)
+                except Exception as e:
+                    # Once the journal is on disk the commit is decided: finish it now if we can,
+                    # else the next commit (in any process) replays it before reading the files
+                    print(f"[store] commit write failed ({e}); replaying journal")
+                    if os.path.exists(journal_file) and not _replay_journal_locked():
+                        raise
+                with _state_lock:
+                    _state.snap = new_snap
+                    _state.meta, _state.meta_stamp = _read_meta(), _file_stamp(meta_file)
+                snapshot.prune(meta["generation"])
+    except Exception as e:
+        with _state_lock:
+            _state.meta_stamp = None
+        if not batch:
+            raise  # an aggregate rebuild: nobody else to report to
+        for req in batch:
+            if not req.error:
+                req.error = e
+            req.changes = []
+    finally:
+        for req in batch:
+            req.done.set()
+
+
+# -----------------------------
+# Loan change log
+# -----------------------------
+# One NDJSON line per commit: {"generation": N, "loans": [[id, record or null], ...]}.
+# Lets in-memory indexes in any worker catch up on the generations they missed
+# instead of rebuilding; a gap (crash, out-of-band edit, restarted log) means rebuild.
+_log_cursor = {"ino": None, "head": None, "offset": 0}
+_log_lock = threading.Lock()
+
+def _log_loan_changes(generation, changes):
+    line = json.dumps({"generation": generation,
+                       "loans": [[(new or old).get("id"), new] for kind, old, new in changes if kind == "loan"]},
+                      ensure_ascii=False) + "\n"
+    try:
+        if os.path.getsize(changes_file) > CHANGE_LOG_BYTES:
+            util.write_file_atomic(changes_file, line, fsync=False)
+            return
+    except OSError:
+        pass
+    with open(changes_file, "a", encoding="utf-8") as f:
+        f.write(line)
+
+def loan_changes_since(generation, upto):
+    """
+    Loan changes committed after `generation` up to and including `upto`, as
+    (loan id, new record or None) in commit order, or None if the log no
+    longer covers that range.
+    """
+    if upto <= generation:
+        return []
+    found = {}
+    with _log_lock:
+        try:
+            f = open(changes_file, "rb")
+        except OSError:
+            return None
+        with f:
+            # A restarted log is a new file, but it can get the old inode back; its
+            # first line (the generation it starts at) tells the two apart
+            ino, head = os.fstat(f.fileno()).st_ino, f.readline()
+            if (ino, head) != (_log_cursor["ino"], _log_cursor["head"]):
+                _log_cursor.update(ino=ino, head=head, offset=0)
+            offset = _log_cursor["offset"]
+            f.seek(offset)
+            advance = True
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # still being appended
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn by a crash: shows up as a gap
+                g = entry.get("generation", 0)
+                if g > upto:
+                    advance = False  # may be in flight; read it again next time
+                elif advance:
+                    _log_cursor["offset"] = offset
+                if generation < g <= upto:
+                    found[g] = entry.get("loans") or []
+    if any(g not in found for g in range(generation + 1, upto + 1)):
+        return None
+    return [tuple(change) for g in range(generation + 1, upto + 1) for change in found[g]]
+
+
+# -----------------------------
+# Durable writes and recovery
+# -----------------------------
+def _fsync_dir(path):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _durable_write(files, meta):
+    journal = {"files": files, "meta": meta}  # path -> new file contents
+    # 1) journal first: once this is on disk the commit is decided
+    util.write_file_atomic(journal_file, json.dumps(journal))
+    # 2) then each file is swapped in; a crash here is replayed from the journal
+    _replay(journal)
+    os.remove(journal_file)
+    _fsync_dir(journal_file)
+
+def _replay(journal):
+    for path, text in journal["files"].items():
+        util.write_file_atomic(path, text)
+    _write_meta(journal["meta"])
+
+def _replay_journal_locked():
+    """
+    Finish a commit left in the journal (or discard a half-written journal);
+    caller holds the FileLock. True if a commit was replayed, False if there
+    was none; raises if the replay itself fails (the journal stays for next time).
+    """
+    if not os.path.exists(journal_file):
+        return False
+    try:
+        with open(journal_file, "r", encoding="utf-8") as f:
+            journal = json.load(f)
+    except ValueError:
+        os.remove(journal_file)
+        print("[store] discarded incomplete commit journal")
+        return False
+    _replay(journal)
+    os.remove(journal_file)
+    _fsync_dir(journal_file)
+    with _state_lock:
+        _state.meta_stamp = None
+    print("[store] replayed interrupted commit")
+    return True
+
+def recover():
+    """
+    Finish a commit interrupted by a crash (or discard a half-written journal),
+    then make sure the snapshot matches the files. Commits do this themselves;
+    calling it at startup just does it before the first request.
+    """
+    with _commit_lock, FileLock():
+        replayed = _replay_journal_locked()
+        _ensure_snapshot_locked()
+        with _state_lock:
+            _state.meta_stamp = None
+        return replayed
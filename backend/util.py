@@ -1,7 +1,8 @@
 """
 Utility functions for BlockLoan platform — safe IO, hashing, validation, and calculations.
 """
-import json, os, hashlib, re, traceback
+import json, os, hashlib, hmac, re, threading, traceback
+from itertools import islice
 from datetime import datetime, timedelta
 def read_json(filepath):
     try:
@@ -12,28 +13,188 @@ def read_json(filepath):
         print(f"[read_json] error reading {filepath}: {e}")
     return []
 
+def write_file_atomic(filepath, text, fsync=True):
+    """Write to a temp file next to `filepath`, fsync it, then rename over the original."""
+    dirpath = os.path.dirname(filepath)
+    if dirpath:
+        os.makedirs(dirpath, exist_ok=True)
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def write_json(filepath, data):
     try:
-        dirpath = os.path.dirname(filepath)
-        if dirpath:
-            os.makedirs(dirpath, exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        write_file_atomic(filepath, json.dumps(data, indent=2, ensure_ascii=False))
         return True
     except Exception as e:
         print(f"[write_json] error writing {filepath}: {e}")
     return False
 
-# Consistent hashing (use same salt across project)
+# Streaming IO (constant memory, for bulk import/export of large files)
+def iter_ndjson(fileobj):
+    """Yield one record per non-blank line of an NDJSON stream."""
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_csv(fileobj):
+    """Yield one dict per CSV row (header row gives the keys)."""
+    import csv
+    for row in csv.DictReader(fileobj):
+        yield {k: (v if v != "" else None) for k, v in row.items()}
+
+def stream_ndjson(records):
+    """Serialize records to NDJSON, one line at a time."""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+def stream_csv(records, fields):
+    """Serialize records to CSV with the given columns, header first, one row at a time."""
+    import csv, io
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+def chunked(iterable, size):
+    """Group an iterable into lists of at most `size` items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def paginate(iterable, page=1, per_page=25, total=None):
+    """
+    Keep only one page of an iterable while counting the rest; returns a page
+    dict. With a known total, stops reading as soon as the page is full.
+    """
+    page = max(1, int(page or 1))
+    per_page = max(1, int(per_page or 25))
+    start = (page - 1) * per_page
+    if total is not None:
+        items = list(islice(iterable, start, start + per_page))
+    else:
+        items, total = [], 0
+        for item in iterable:
+            if start <= total < start + per_page:
+                items.append(item)
+            total += 1
+    pages = max(1, (total + per_page - 1) // per_page)
+    return {"items": items, "page": page, "per_page": per_page, "total": total, "pages": pages}
+
+def in_date_range(timestamp, date_from=None, date_to=None):
+    """Compare the YYYY-MM-DD prefix of an ISO timestamp against an inclusive range."""
+    day = (timestamp or "")[:10]
+    if date_from and (not day or day < date_from):
+        return False
+    if date_to and (not day or day > date_to):
+        return False
+    return True
+
+# Password hashing
+# Current format: "scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>" with a random per-user salt.
+# Legacy format: bare sha256 hex of (_SALT + password) — still verified, and rehashed on login.
 _SALT = os.getenv("PASSWORD_SALT", "microloan_salt_v1_secure")
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", 2 ** 14))  # cost: CPU and memory (128 * r * n bytes)
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", 8))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+
+def _legacy_hash(password):
+    return hashlib.sha256(( _SALT + str(password) ).encode('utf-8')).hexdigest()
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(str(password).encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n + 1024 * 1024, dklen=32)
 
 def hash_password(password: str) -> str:
     if password is None:
         password = ""
-    return hashlib.sha256(( _SALT + str(password) ).encode('utf-8')).hexdigest()
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
 
 def verify_password(password: str, hashed: str) -> bool:
-    return hash_password(password) == (hashed or "")
+    hashed = hashed or ""
+    if password is None:
+        password = ""
+    if hashed.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, digest = hashed.split("$")
+            candidate = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(candidate.hex(), digest)
+    return hmac.compare_digest(_legacy_hash(password), hashed)
+
+# Checked when the username doesn't exist: a real scrypt run at the current cost that never matches
+DUMMY_PASSWORD_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${'00' * 16}${'00' * 32}"
+
+def needs_rehash(hashed: str) -> bool:
+    """True for legacy hashes or ones made with weaker cost settings than the current ones."""
+    parts = (hashed or "").split("$")
+    if len(parts) != 6 or parts[0] != "scrypt":
+        return True
+    try:
+        return (int(parts[1]), int(parts[2]), int(parts[3])) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True  # malformed cost fields: replace it with a well-formed hash
+
+def hash_passwords(passwords, workers=None):
+    """Hash many passwords in parallel processes (bulk seeding); small inputs are hashed inline."""
+    passwords = list(passwords)
+    if len(passwords) < 2:
+        return [hash_password(p) for p in passwords]
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+# Hashing runs on a bounded pool so a burst of logins can't pile unbounded KDF work
+# onto request threads: at most HASH_WORKERS run at once, HASH_QUEUE more may wait,
+# and anything beyond that fails fast with HashPoolBusy (the KDF releases the GIL).
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 2))
+HASH_QUEUE = int(os.getenv("HASH_QUEUE", 4 * HASH_WORKERS))
+HASH_WAIT_SECONDS = float(os.getenv("HASH_WAIT_SECONDS", 2))
+
+class HashPoolBusy(Exception):
+    """Too many password hashes are queued; the caller should retry shortly."""
+
+_hash_pool = None
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE)
+_hash_pool_lock = threading.Lock()
+
+def run_hash_job(fn, *args):
+    """Run fn(*args) (hash_password / verify_password) on the bounded hashing pool."""
+    global _hash_pool
+    if not _hash_slots.acquire(timeout=HASH_WAIT_SECONDS):
+        raise HashPoolBusy("Password hashing queue is full")
+    try:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                _hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+        return _hash_pool.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
 
 def generate_anon_id(username: str) -> str:
     return hashlib.sha1((str(username) + "anon").encode()).hexdigest()[:8]
@@ -101,16 +262,19 @@ def validate_password(password):
         return False, "Password must contain digit"
     return True, "Password is valid"
 
-# Stats (reads loans file path if provided)
-def get_loan_stats(loans_file="data/loans.json"):
-    loans = read_json(loans_file) or []
-    total_loans = len(loans)
-    pending_loans = len([l for l in loans if l.get("status") == "pending"])
-    funded = len([l for l in loans if l.get("status") == "funded"])
-    return {"total_loans": total_loans, "pending_loans": pending_loans, "funded": funded}
+# Stats from the store's per-status counts; archived loans come from the archive's counts
+def get_loan_stats():
+    from backend import archive, store
+    counts = store.counts("loan")
+    archived = sum(archive.archived_counts().values())
+    total_loans = sum(counts.values()) + archived
+    return {"total_loans": total_loans, "pending_loans": counts.get("pending", 0),
+            "funded": counts.get("funded", 0), "archived": archived}
 
 from flask import session
 USERS_FILE = "data/users.json"
+# Column order used by CSV/NDJSON exports (password hashes are never exported by default)
+USER_EXPORT_FIELDS = ["id", "username", "email", "role", "balance", "created_at"]
 
 def get_all_users():
     """Return all users as a list of dicts."""
@@ -119,6 +283,16 @@ def get_all_users():
         return users
     return []
 
+def iter_users(role=None, date_from=None, date_to=None):
+    """Stream users from the store snapshot one at a time, optionally filtered by role and created_at range."""
+    from backend import store
+    for user in store.Transaction().users():
+        if role and user.get("role") != role:
+            continue
+        if not in_date_range(user.get("created_at"), date_from, date_to):
+            continue
+        yield user
+
 def refresh_session_user():
     """Return the current logged-in user object from session, or None."""
     user_id = session.get("user_id")
@@ -1,22 +1,26 @@
-from backend.util import read_json, write_json, hash_password
+from backend import store
+from backend.util import hash_passwords
 from datetime import datetime
 
 def reset_admin():
-    users = read_json("data/users.json")
+    password_hash, = hash_passwords(["admin123"])  # default password
 
-    # Remove any existing admin
-    users = [u for u in users if u.get("role") != "admin"]
+    def _reset(txn):
+        # Remove any existing admin
+        for user in list(txn.users()):
+            if user.get("role") == "admin" or user.get("username") == "admin":
+                txn.delete_user(user)
 
-    # Add default admin
-    users.append({
-        "username": "admin",
-        "password": hash_password("admin123"),  # default password
-        "role": "admin",
-        "balance": 10000,
-        "created_at": datetime.now().isoformat()
-    })
+        # Add default admin
+        txn.put_user({
+            "username": "admin",
+            "password_hash": password_hash,
+            "role": "admin",
+            "balance": 10000,
+            "created_at": datetime.now().isoformat()
+        })
 
-    write_json("data/users.json", users)
+    store.run_transaction(_reset)
     print("Admin account reset!")
     print("Username: admin")
     print("Password: admin123")
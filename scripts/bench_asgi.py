@@ -0,0 +1,166 @@
+# scripts/bench_asgi.py
+"""
+Concurrency benchmark for the funding path: sync WSGI vs the ASGI mode.
+
+Starts the Multichain and SMTP stand-ins (scripts/standins.py) with the given
+latency, copies the app into a scratch directory seeded with one lender per
+client and a pool of pending loans, then serves it twice with the same
+thread budget:
+
+    sync:  gunicorn -w 1 --threads T app:app
+    asgi:  uvicorn asgi:app              (ASGI_THREADS=T)
+
+and has C concurrent clients fund loans against each. Prints throughput and
+latency percentiles per mode. Needs gunicorn and uvicorn installed (httpx and
+aiosmtplib for the non-blocking clients).
+
+Usage (from the project root):
+    python -m scripts.bench_asgi --loans 400 --concurrency 64 --threads 8 --latency-ms 200
+"""
+import os, sys, json, time, shutil, socket, argparse, tempfile, threading, subprocess, uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+from backend import util
+from scripts.standins import Faults, MultichainStandin, SmtpSink
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LENDER_PASSWORD = "BenchPass1"
+
+
+# -----------------------------
+# Setup
+# -----------------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _seed(workdir, lenders, loans):
+    """Fresh copy of the app with `lenders` funded lenders and `loans` pending loans."""
+    os.makedirs(workdir)
+    for name in ("app.py", "asgi.py"):
+        shutil.copy(os.path.join(PROJECT_ROOT, name), workdir)
+    for name in ("backend", "templates"):
+        shutil.copytree(os.path.join(PROJECT_ROOT, name), os.path.join(workdir, name),
+                        ignore=shutil.ignore_patterns("__pycache__"))
+    os.makedirs(os.path.join(workdir, "data"))
+    now = datetime.utcnow().isoformat()
+    password_hash = util.hash_password(LENDER_PASSWORD)
+    users = [{"id": i + 1, "username": f"lender{i}", "password_hash": password_hash, "role": "lender",
+              "balance": 1e9, "created_at": now} for i in range(lenders)]
+    book = [{"id": str(uuid.uuid4()), "borrower_username": f"borrower{i % 50}", "amount": 100.0,
+             "duration_months": 6, "description": "bench loan", "status": "pending",
+             "created_at": now} for i in range(loans)]
+    for name, data in (("users.json", users), ("loans.json", book)):
+        with open(os.path.join(workdir, "data", name), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    return [l["id"] for l in book]
+
+def _wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise Exception(f"server at {url} did not come up")
+
+
+# -----------------------------
+# Load
+# -----------------------------
+def _run_clients(base_url, loan_ids, concurrency):
+    # Log every lender in first (KDF work, not what we're measuring)
+    cookies = []
+    for i in range(concurrency):
+        r = requests.post(f"{base_url}/login", data={"username": f"lender{i}", "password": LENDER_PASSWORD},
+                          allow_redirects=False)
+        cookies.append(r.cookies.get_dict())
+
+    queue, lock, latencies = list(loan_ids), threading.Lock(), []
+
+    def _client(i):
+        session = requests.Session()
+        while True:
+            with lock:
+                if not queue:
+                    return
+                loan_id = queue.pop()
+            started = time.perf_counter()
+            # Same login cookie every time: flashed messages must not pile up in it
+            session.post(f"{base_url}/fund_loan/{loan_id}", cookies=cookies[i], allow_redirects=False)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_client, range(concurrency)))
+    return time.perf_counter() - started, sorted(latencies)
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def bench(mode, args, env, chain, sink):
+    workdir = os.path.join(tempfile.mkdtemp(prefix="bench-"), mode)
+    loan_ids = _seed(workdir, args.concurrency, args.loans)
+    port = _free_port()
+    published, mailed = chain.faults.served, sink.messages
+    if mode == "sync":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", "1", "--threads", str(args.threads),
+               "-b", f"127.0.0.1:{port}", "app:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning"]
+    server = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+                              stderr=None if args.verbose else subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        _wait_for(f"{base_url}/about")
+        elapsed, latencies = _run_clients(base_url, loan_ids, args.concurrency)
+        time.sleep(args.latency_ms / 1000.0 * 2 + 0.5)  # let queued side effects drain
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    with open(os.path.join(workdir, "data", "loans.json"), encoding="utf-8") as f:
+        funded = sum(1 for l in json.load(f) if l.get("status") != "pending")
+    shutil.rmtree(os.path.dirname(workdir), ignore_errors=True)
+    return {"mode": mode, "requests": len(latencies), "funded": funded,
+            "published": chain.faults.served - published, "mailed": sink.messages - mailed,
+            "seconds": round(elapsed, 2),
+            "req_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the funding path under sync WSGI vs ASGI.")
+    parser.add_argument("--loans", type=int, default=400, help="loans to fund per run")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent clients (one lender each)")
+    parser.add_argument("--threads", type=int, default=8, help="worker threads in both modes")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stand-in RPC and SMTP latency")
+    parser.add_argument("--modes", default="sync,asgi")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args(argv)
+
+    mc_port, smtp_port = _free_port(), _free_port()
+    chain = MultichainStandin(Faults(latency_ms=args.latency_ms))
+    sink = SmtpSink(Faults(latency_ms=args.latency_ms))
+    for server in (chain.serve("127.0.0.1", mc_port), sink.serve("127.0.0.1", smtp_port)):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    env = dict(os.environ,
+               MULTICHAIN_RPC_HOST="127.0.0.1", MULTICHAIN_RPC_PORT=str(mc_port),
+               SMTP_SERVER="127.0.0.1", SMTP_PORT=str(smtp_port), SMTP_TLS="0", SENDER_PASSWORD="bench",
+               ASGI_THREADS=str(args.threads), ARCHIVE_INTERVAL="0", PYTHONUNBUFFERED="1")
+    results = [bench(mode, args, env, chain, sink) for mode in args.modes.split(",")]
+    print(f"{'mode':6} {'requests':>8} {'funded':>7} {'published':>9} {'mailed':>7} {'seconds':>8} "
+          f"{'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['mode']:6} {r['requests']:>8} {r['funded']:>7} {r['published']:>9} {r['mailed']:>7} "
+              f"{r['seconds']:>8} {r['req_per_s']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8}")
+
+if __name__ == "__main__":
+    main()
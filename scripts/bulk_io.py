@@ -0,0 +1,224 @@
+# scripts/bulk_io.py
+"""
+Bulk import/export of users and loans.
+
+Input is streamed from CSV or NDJSON in batches; every batch is validated with
+the same rules as the web forms, passwords are hashed in a process pool and the
+batch is committed as a single store transaction. Exports stream the JSON stores row by
+row, so memory stays flat regardless of file size.
+
+Usage (from the project root):
+    python -m scripts.bulk_io import-users partners.csv
+    python -m scripts.bulk_io import-loans loans.ndjson --batch-size 20000
+    python -m scripts.bulk_io export-users users.csv
+    python -m scripts.bulk_io export-loans - --format ndjson > loans.ndjson
+"""
+import os, sys, argparse, uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from backend import util, loan, store
+
+USER_FIELDS = util.USER_EXPORT_FIELDS
+LOAN_FIELDS = loan.LOAN_EXPORT_FIELDS
+IMPORT_ROLES = {"borrower", "lender"}
+LOAN_STATUSES = {"pending", "approved_by_lender", "funded", "rejected"}
+
+# -----------------------------
+# Input helpers
+# -----------------------------
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+def _open_input(path):
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8", newline="")
+
+def _open_output(path):
+    if path == "-":
+        return sys.stdout
+    return open(path, "w", encoding="utf-8", newline="")
+
+def _iter_rows(fileobj, fmt):
+    return util.iter_csv(fileobj) if fmt == "csv" else util.iter_ndjson(fileobj)
+
+# -----------------------------
+# Users
+# -----------------------------
+def _normalize_user_row(row):
+    """Strip username and role once, so validation and the stored user see the same values."""
+    row["username"] = (row.get("username") or "").strip()
+    row["role"] = (row.get("role") or "borrower").strip()
+    return row
+
+def _validate_user_row(row, known_usernames):
+    username, role = row["username"], row["role"]
+    if not username:
+        return "missing username"
+    if username in known_usernames:
+        return f"username '{username}' already exists"
+    if role not in IMPORT_ROLES:
+        return f"invalid role '{role}'"
+    email = row.get("email")
+    if email and not util.validate_email(email):
+        return f"invalid email '{email}'"
+    if row.get("password_hash") and not row.get("password"):
+        return None
+    valid, msg = util.validate_password(row.get("password") or "")
+    return None if valid else msg
+
+def import_users(path, fmt=None, batch_size=10000, workers=None):
+    known = {u.get("username") for u in util.iter_users()}
+    imported, rejected = 0, 0
+
+    with _open_input(path) as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = _iter_rows(f, _detect_format(path, fmt))
+        for batch_no, batch in enumerate(util.chunked(rows, batch_size), start=1):
+            accepted = []
+            for row in map(_normalize_user_row, batch):
+                error = _validate_user_row(row, known)
+                if error:
+                    rejected += 1
+                    print(f"[import-users] skipped row: {error}", file=sys.stderr)
+                    continue
+                known.add(row["username"])
+                accepted.append(row)
+
+            to_hash = [r["password"] for r in accepted if r.get("password")]
+            chunk = max(1, len(to_hash) // ((workers or os.cpu_count() or 1) * 4))
+            hashes = iter(pool.map(util.hash_password, to_hash, chunksize=chunk))
+
+            now = datetime.utcnow().isoformat()
+            users = []
+            for row in accepted:
+                role = row["role"]
+                user = {
+                    "username": row["username"],
+                    "password_hash": next(hashes) if row.get("password") else row["password_hash"],
+                    "role": role,
+                    "balance": util.safe_float(row["balance"]) if row.get("balance") is not None
+                               else (1000.0 if role == "lender" else 0.0),
+                    "created_at": row.get("created_at") or now
+                }
+                if row.get("email"):
+                    user["email"] = row["email"]
+                users.append(user)
+
+            if users:
+                store.run_transaction(lambda txn: [txn.put_user({"id": txn.next_id("user"), **u}, insert=True)
+                                                   for u in users])
+            imported += len(accepted)
+            print(f"[import-users] batch {batch_no}: {len(accepted)} imported, total {imported}")
+
+    print(f"[import-users] done: {imported} imported, {rejected} rejected")
+    return imported, rejected
+
+def export_users(path, fmt=None, include_hashes=False):
+    fmt = _detect_format(path, fmt)
+    fields = USER_FIELDS + (["password_hash"] if include_hashes else [])
+
+    def records():
+        for user in util.iter_users():
+            yield {k: user.get(k) for k in fields}
+
+    return _write_stream(path, fmt, records(), fields)
+
+# -----------------------------
+# Loans
+# -----------------------------
+def _validate_loan_row(row, borrowers, known_ids):
+    if row.get("borrower_username") not in borrowers:
+        return f"unknown borrower '{row.get('borrower_username')}'"
+    if row.get("id") and row["id"] in known_ids:
+        return f"loan id '{row['id']}' already exists"
+    try:
+        amount = float(row.get("amount"))
+        duration = int(row.get("duration_months"))
+    except (TypeError, ValueError):
+        return "amount and duration_months must be numbers"
+    if amount <= 0 or duration <= 0:
+        return "amount and duration_months must be positive"
+    status = row.get("status") or "pending"
+    if status not in LOAN_STATUSES:
+        return f"invalid status '{status}'"
+    return None
+
+def import_loans(path, fmt=None, batch_size=10000):
+    known_ids = {l.get("id") for l in loan.iter_loans()}
+    borrowers = {u.get("username") for u in util.iter_users(role="borrower")}
+    imported, rejected = 0, 0
+
+    with _open_input(path) as f:
+        rows = _iter_rows(f, _detect_format(path, fmt))
+        for batch_no, batch in enumerate(util.chunked(rows, batch_size), start=1):
+            accepted = 0
+            loans = []
+            now = datetime.utcnow().isoformat()
+            for row in batch:
+                error = _validate_loan_row(row, borrowers, known_ids)
+                if error:
+                    rejected += 1
+                    print(f"[import-loans] skipped row: {error}", file=sys.stderr)
+                    continue
+                new_loan = {k: row.get(k) for k in LOAN_FIELDS}
+                new_loan["id"] = new_loan["id"] or str(uuid.uuid4())
+                new_loan["amount"] = float(row["amount"])
+                new_loan["duration_months"] = int(row["duration_months"])
+                new_loan["status"] = new_loan["status"] or "pending"
+                new_loan["created_at"] = new_loan["created_at"] or now
+                known_ids.add(new_loan["id"])
+                loans.append(new_loan)
+                accepted += 1
+
+            if loans:
+                store.run_transaction(lambda txn: [txn.put_loan(l, insert=True) for l in loans])
+            imported += accepted
+            print(f"[import-loans] batch {batch_no}: {accepted} imported, total {imported}")
+
+    print(f"[import-loans] done: {imported} imported, {rejected} rejected")
+    return imported, rejected
+
+def export_loans(path, fmt=None):
+    fmt = _detect_format(path, fmt)
+    return _write_stream(path, fmt, loan.iter_loans(), LOAN_FIELDS)
+
+# -----------------------------
+# Output
+# -----------------------------
+def _write_stream(path, fmt, records, fields):
+    chunks = util.stream_csv(records, fields) if fmt == "csv" else util.stream_ndjson(records)
+    out = _open_output(path)
+    count = 0
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"[export] wrote {path}", file=sys.stderr)
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export for BlockLoan users and loans.")
+    parser.add_argument("command", choices=["import-users", "import-loans", "export-users", "export-loans"])
+    parser.add_argument("path", help="input/output file, or - for stdin/stdout")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per committed batch")
+    parser.add_argument("--workers", type=int, default=None, help="password hashing processes")
+    parser.add_argument("--include-hashes", action="store_true", help="export password hashes too")
+    args = parser.parse_args(argv)
+
+    if args.command == "import-users":
+        import_users(args.path, args.format, args.batch_size, args.workers)
+    elif args.command == "import-loans":
+        import_loans(args.path, args.format, args.batch_size)
+    elif args.command == "export-users":
+        export_users(args.path, args.format, args.include_hashes)
+    else:
+        export_loans(args.path, args.format)
+
+if __name__ == "__main__":
+    main()
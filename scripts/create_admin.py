@@ -6,21 +6,12 @@ Created on Sat Nov 29 20:50:02 2025
 """
 
 # scripts/create_admin.py
-import os, getpass, json
-from backend import util
+import os, getpass
+from backend import util, store
 
 USERS_FILE = "data/users.json"
 os.makedirs("data", exist_ok=True)
 
-def load_users():
-    try:
-        return util.read_json(USERS_FILE) or []
-    except:
-        return []
-
-def save_users(users):
-    return util.write_json(USERS_FILE, users)
-
 def main():
     print("Create or reset admin user.")
     username = input("Admin username [admin]: ").strip() or "admin"
@@ -28,23 +19,28 @@ def main():
     valid, msg = util.validate_password(pwd)
     if not valid:
         print("Password invalid:", msg); return
-    users = load_users()
-    existing = next((u for u in users if u.get("username") == username), None)
-    if existing:
-        existing["password_hash"] = util.hash_password(pwd)
-        existing["role"] = "admin"
+    password_hash, = util.hash_passwords([pwd])
+
+    def _save(txn):
+        existing = txn.get_user(username)
+        if existing:
+            existing["password_hash"] = password_hash
+            existing["role"] = "admin"
+            txn.put_user(existing)
+        else:
+            txn.put_user({
+                "username": username,
+                "password_hash": password_hash,
+                "role": "admin",
+                "balance": 0.0,
+                "created_at": ""
+            }, insert=True)
+        return existing is not None
+
+    if store.run_transaction(_save):
         print(f"Reset password for existing user {username}.")
     else:
-        new_user = {
-            "username": username,
-            "password_hash": util.hash_password(pwd),
-            "role": "admin",
-            "balance": 0.0,
-            "created_at": ""
-        }
-        users.append(new_user)
         print(f"Created admin user {username}.")
-    save_users(users)
     print("Done. You can now log in with that admin account.")
 
 if __name__ == "__main__":
@@ -0,0 +1,291 @@
+# scripts/standins.py
+"""
+Local stand-ins for the Multichain node and the SMTP server, for load tests.
+
+`multichain` serves the JSON-RPC calls backend/blockchain.py makes (publish,
+liststreamitems, plus getinfo for counters) against in-memory streams. `smtp`
+is a sink that accepts and counts messages. Both can inject latency, random
+failures and a throughput cap, so the funding path can be measured end to end
+(and under failure) without a real chain or mail server.
+
+Usage (from the project root), then start the app pointed at them:
+    python -m scripts.standins multichain --port 8570 --latency-ms 40 --error-rate 0.01
+    python -m scripts.standins smtp --port 2525 --latency-ms 150 --max-rate 20
+
+    MULTICHAIN_RPC_HOST=127.0.0.1 MULTICHAIN_RPC_PORT=8570 \
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_TLS=0 SENDER_PASSWORD=x python app.py
+"""
+import json, time, random, base64, hashlib, argparse, threading, socketserver
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# -----------------------------
+# Fault injection
+# -----------------------------
+class Faults:
+    """Latency, random errors and a throughput cap shared by both stand-ins."""
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, max_rate=0.0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+        self.served = 0
+        self.failed = 0
+
+    def delay(self):
+        """Block like a saturated server would: wait for a rate slot, then the service time."""
+        wait = 0.0
+        if self.interval:
+            with self._lock:
+                now = time.monotonic()
+                slot = max(now, self._next_slot)
+                self._next_slot = slot + self.interval
+                wait = slot - now
+        service = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        if wait + service > 0:
+            time.sleep(wait + service)
+
+    def should_fail(self):
+        failed = self.error_rate > 0 and random.random() < self.error_rate
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.served += 1
+        return failed
+
+
+# -----------------------------
+# Multichain JSON-RPC
+# -----------------------------
+class MultichainStandin:
+    def __init__(self, faults, rpc_user=None, rpc_password=None):
+        self.faults = faults
+        self.rpc_user = rpc_user
+        self.rpc_password = rpc_password
+        self.streams = {}  # stream -> [item]
+        self._lock = threading.Lock()
+
+    def publish(self, stream, key, data_hex):
+        bytes.fromhex(data_hex)  # reject what a real node would reject
+        with self._lock:
+            items = self.streams.setdefault(stream, [])
+            txid = hashlib.sha256(f"{stream}:{len(items)}:{data_hex}".encode()).hexdigest()
+            items.append({
+                "publishers": [self.rpc_user or "standin"],
+                "keys": [key] if isinstance(key, str) else list(key),
+                "data": data_hex,
+                "confirmations": 0,
+                "blocktime": int(time.time()),
+                "txid": txid
+            })
+        return txid
+
+    def liststreamitems(self, stream, verbose=False, count=10, start=None):
+        with self._lock:
+            if stream not in self.streams:
+                raise LookupError(f"Stream with this name not found: {stream}")
+            items = self.streams[stream]
+            start = -count if start is None else start  # like multichain: newest `count` by default
+            return items[start:][:count]
+
+    def getinfo(self):
+        with self._lock:
+            items = {name: len(items) for name, items in self.streams.items()}
+        return {"streams": items, "served": self.faults.served, "failed": self.faults.failed}
+
+    def call(self, method, params):
+        if method == "publish":
+            return self.publish(*params)
+        if method == "liststreamitems":
+            return self.liststreamitems(*params)
+        if method == "getinfo":
+            return self.getinfo()
+        raise NotImplementedError(f"Method not found: {method}")
+
+    def serve(self, host, port):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if standin.rpc_password is not None and not self._authorized():
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                standin.faults.delay()
+                request_id = None
+                try:
+                    request = json.loads(body)
+                    request_id = request.get("id")
+                    if standin.faults.should_fail():
+                        raise RuntimeError("Injected failure")
+                    reply = {"result": standin.call(request.get("method"), request.get("params") or []),
+                             "error": None, "id": request_id}
+                except Exception as e:
+                    code = -32601 if isinstance(e, NotImplementedError) else -708 if isinstance(e, LookupError) else -32603
+                    reply = {"result": None, "error": {"code": code, "message": str(e)}, "id": request_id}
+                data = json.dumps(reply).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _authorized(self):
+                expected = base64.b64encode(f"{standin.rpc_user}:{standin.rpc_password}".encode()).decode()
+                return self.headers.get("Authorization") == f"Basic {expected}"
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        print(f"[standin] multichain JSON-RPC on http://{host}:{port}")
+        return server
+
+
+# -----------------------------
+# SMTP sink
+# -----------------------------
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class SmtpSink:
+    """Speaks enough SMTP for smtplib (EHLO, AUTH, MAIL, RCPT, DATA); no STARTTLS."""
+    def __init__(self, faults, verbose=False):
+        self.faults = faults
+        self.verbose = verbose
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def serve(self, host, port):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write((line + "\r\n").encode("ascii"))
+
+            def handle(self):
+                self.reply("220 standin ESMTP ready")
+                sender, recipients = None, []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode("utf-8", "replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb == "EHLO":
+                        self.reply("250-standin")
+                        self.reply("250-AUTH PLAIN LOGIN")
+                        self.reply("250 8BITMIME")
+                    elif verb == "HELO":
+                        self.reply("250 standin")
+                    elif verb == "AUTH":
+                        self._auth(command)
+                    elif verb == "MAIL":
+                        sender, recipients = command[10:].strip(), []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command[8:].strip())
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        size = self._read_data()
+                        sink.faults.delay()
+                        if sink.faults.should_fail():
+                            self.reply("451 4.3.0 Injected failure")
+                        else:
+                            sink._record(sender, recipients, size)
+                            self.reply("250 OK queued")
+                        sender, recipients = None, []
+                    elif verb in ("RSET", "NOOP"):
+                        sender, recipients = (None, []) if verb == "RSET" else (sender, recipients)
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+            def _auth(self, command):
+                parts = command.split()
+                if len(parts) > 1 and parts[1].upper() == "LOGIN":
+                    # smtplib sends the username with the command, then the password on its own line
+                    if len(parts) < 3:
+                        self.reply("334 VXNlcm5hbWU6")
+                        self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                self.reply("235 Authentication successful")
+
+            def _read_data(self):
+                size = 0
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        return size
+                    size += len(line)
+
+        server = _TCPServer((host, port), Handler)
+        print(f"[standin] SMTP sink on {host}:{port}")
+        return server
+
+    def _record(self, sender, recipients, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+        if self.verbose:
+            print(f"[standin] mail {sender} -> {', '.join(recipients)} ({size} bytes)")
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def _report(name, faults, extra, every):
+    while True:
+        time.sleep(every)
+        print(f"[standin] {name}: served={faults.served} failed={faults.failed} {extra()}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Multichain / SMTP stand-ins for load testing.")
+    parser.add_argument("service", choices=["multichain", "smtp"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="defaults to 8570 (multichain) / 2525 (smtp)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean service time per call/message")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="std deviation of the service time")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls/messages that fail (0..1)")
+    parser.add_argument("--max-rate", type=float, default=0.0, help="throughput cap per second; excess queues (0 = none)")
+    parser.add_argument("--rpc-user", default=None, help="require this basic-auth user (multichain)")
+    parser.add_argument("--rpc-password", default=None, help="require this basic-auth password (multichain)")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between counter lines (0 = off)")
+    parser.add_argument("--verbose", action="store_true", help="log every message (smtp)")
+    args = parser.parse_args(argv)
+
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.max_rate)
+    if args.service == "multichain":
+        standin = MultichainStandin(faults, args.rpc_user, args.rpc_password)
+        server = standin.serve(args.host, args.port or 8570)
+        extra = lambda: f"streams={standin.getinfo()['streams']}"
+    else:
+        sink = SmtpSink(faults, args.verbose)
+        server = sink.serve(args.host, args.port or 2525)
+        extra = lambda: f"messages={sink.messages} bytes={sink.bytes}"
+    if args.report_every > 0:
+        threading.Thread(target=_report, args=(args.service, faults, extra, args.report_every), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os, sys, json
+import pytest
+
+# Run from the project root like the app does (backend.* imports, data/ paths)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import store
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty store in a scratch directory, with this process's cached store state reset."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    for name in ("loans.json", "users.json"):
+        with open(os.path.join("data", name), "w", encoding="utf-8") as f:
+            json.dump([], f)
+    monkeypatch.setattr(store, "_state", store._State())
+    monkeypatch.setattr(store, "_aggregates", {})
+    monkeypatch.setattr(store, "_log_cursor", {"ino": None, "head": None, "offset": 0})
+    return tmp_path
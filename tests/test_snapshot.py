@@ -0,0 +1,43 @@
+import random
+from backend import snapshot
+
+
+def _loan(i, status="pending"):
+    return {"id": f"L{i}", "borrower_username": f"b{i % 7}", "lender_username": None, "status": status,
+            "amount": 10.0 * i}
+
+def _entries(kind, records):
+    field = snapshot.key_field(kind)
+    return [(snapshot.key_hash(r[field]), snapshot.element(r), snapshot.field_hashes(kind, r)) for r in records]
+
+def _write(generation, kind, records):
+    return snapshot.Snapshot(snapshot.write(generation, None, {kind: _entries(kind, records)}, {}))
+
+
+def test_patched_table_matches_a_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "snapshot_dir", str(tmp_path))
+    rng = random.Random(7)
+    records = [_loan(i) for i in range(200)]
+    snap = _write(1, "loan", records)
+    for generation in range(2, 12):
+        changes = {}
+        for i in rng.sample(range(len(records) + 20), 15):
+            key = f"L{i}"
+            # Longer, shorter and deleted records, and new keys
+            changes[key] = None if rng.random() < 0.3 else dict(_loan(i, rng.choice(["funded", "x" * rng.randrange(30)])))
+        by_key = {r["id"]: r for r in records}
+        for key, record in changes.items():
+            if record is None:
+                by_key.pop(key, None)
+            else:
+                by_key[key] = record
+        records = list(by_key.values())  # dicts keep existing keys in place and append new ones
+
+        patched = snap.table("loan", changes)
+        rebuilt = snapshot.build_table("loan", _entries("loan", records))
+        assert (patched.count, bytes(patched.index), bytes(patched.data)) == \
+            (rebuilt.count, rebuilt.index, rebuilt.data)
+        snap = snapshot.Snapshot(snapshot.write(generation, None, {"loan": patched}, {}))
+        assert list(snap.records("loan")) == records
+        assert snap.get("loan", "L3") == by_key.get("L3")
+        assert snap.find("loan", "borrower_username", "b2") == [r for r in records if r["borrower_username"] == "b2"]
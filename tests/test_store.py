@@ -0,0 +1,227 @@
+import os, json, errno, threading, time
+import pytest
+from backend import store, util
+
+
+def _seed(users=(), loans=()):
+    def _work(txn):
+        for user in users:
+            txn.put_user(user, insert=True)
+        for loan in loans:
+            txn.put_loan(loan, insert=True)
+    store.run_transaction(_work)
+
+def _fund(txn):
+    loan = txn.get_loan("L1")
+    lender = txn.get_user("lender")
+    loan["status"] = "approved_by_lender"
+    lender["balance"] -= loan["amount"]
+    txn.put_loan(loan)
+    txn.put_user(lender)
+
+def _on_disk(path):
+    with open(path, encoding="utf-8") as f:
+        return {r.get("id") or r.get("username"): r for r in json.load(f)}
+
+
+# -----------------------------
+# Optimistic concurrency
+# -----------------------------
+def test_stale_write_conflicts(data_dir):
+    _seed(users=[{"username": "ann", "balance": 10}])
+    stale = store.Transaction()
+    ann = stale.get_user("ann")
+    store.run_transaction(lambda txn: txn.put_user(dict(txn.get_user("ann"), balance=20)))
+    stale.put_user(dict(ann, balance=99))
+    with pytest.raises(store.TransactionConflict):
+        store.commit(stale)
+    assert store.read_user("ann")["balance"] == 20
+
+def test_duplicate_insert_conflicts(data_dir):
+    _seed(users=[{"username": "ann"}])
+    with pytest.raises(store.TransactionConflict):
+        store.run_transaction(lambda txn: txn.put_user({"username": "ann"}, insert=True), retries=1)
+
+def test_run_transaction_retries_from_a_fresh_snapshot(data_dir):
+    _seed(users=[{"username": "ann", "balance": 10}])
+    calls = []
+
+    def _work(txn):
+        ann = txn.get_user("ann")
+        if not calls:
+            # Someone else commits between our read and our commit
+            store.run_transaction(lambda other: other.put_user(dict(other.get_user("ann"), balance=15)))
+        calls.append(ann["balance"])
+        ann["balance"] += 1
+        txn.put_user(ann)
+
+    store.run_transaction(_work)
+    assert calls == [10, 15]
+    assert store.read_user("ann")["balance"] == 16
+
+def test_concurrent_id_claims_conflict(data_dir):
+    first, second = store.Transaction(), store.Transaction()
+    assert first.next_id("user") == second.next_id("user") == 1
+    store.commit(first)
+    with pytest.raises(store.TransactionConflict):
+        store.commit(second)
+    assert store.run_transaction(lambda txn: txn.next_id("user")) == 2
+
+def test_id_counter_resumes_after_external_edits(data_dir):
+    _seed(users=[{"username": "ann"}])
+    with open(store.users_file, "w", encoding="utf-8") as f:
+        json.dump([{"id": 7, "username": "ann"}], f)
+    assert store.run_transaction(lambda txn: txn.next_id("user")) == 8
+
+
+# -----------------------------
+# Group commit
+# -----------------------------
+def test_concurrent_transactions_share_one_commit(data_dir):
+    _seed(users=[{"username": f"u{i}", "balance": 0} for i in range(5)])
+    generation = store.generation()
+    threads = [threading.Thread(target=store.run_transaction,
+                                args=(lambda txn, i=i: txn.put_user(dict(txn.get_user(f"u{i}"), balance=i)),))
+               for i in range(5)]
+    with store._commit_lock:  # hold commits until all five are queued
+        for t in threads:
+            t.start()
+        deadline = time.time() + 5
+        while len(store._queue) < 5 and time.time() < deadline:
+            time.sleep(0.01)
+    for t in threads:
+        t.join()
+    assert store.generation() == generation + 1
+    assert [store.read_user(f"u{i}")["balance"] for i in range(5)] == list(range(5))
+
+def test_no_lost_updates_under_contention(data_dir):
+    _seed(users=[{"username": "ann", "balance": 0}])
+
+    def _increment(txn):
+        ann = txn.get_user("ann")
+        ann["balance"] += 1
+        txn.put_user(ann)
+
+    threads = [threading.Thread(target=store.run_transaction, args=(_increment, 50)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.read_user("ann")["balance"] == 8
+    assert _on_disk(store.users_file)["ann"]["balance"] == 8
+
+
+# -----------------------------
+# Journal replay
+# -----------------------------
+def _failing_writes(monkeypatch, path, times):
+    """Make util.write_file_atomic raise ENOSPC for `path` the next `times` calls."""
+    real = util.write_file_atomic
+    left = {"n": times}
+
+    def _write(filepath, text, fsync=True):
+        if filepath == path and left["n"] > 0:
+            left["n"] -= 1
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return real(filepath, text, fsync)
+    monkeypatch.setattr(util, "write_file_atomic", _write)
+
+def test_failed_file_write_is_finished_in_the_same_commit(data_dir, monkeypatch):
+    _seed(users=[{"username": "lender", "balance": 100}], loans=[{"id": "L1", "amount": 40, "status": "pending"}])
+    _failing_writes(monkeypatch, store.users_file, times=1)
+    store.run_transaction(_fund)
+    assert _on_disk(store.loans_file)["L1"]["status"] == "approved_by_lender"
+    assert _on_disk(store.users_file)["lender"]["balance"] == 60
+    assert not os.path.exists(store.journal_file)
+
+def test_half_applied_commit_is_replayed_by_the_next_commit(data_dir, monkeypatch):
+    _seed(users=[{"username": "lender", "balance": 100}, {"username": "other"}],
+          loans=[{"id": "L1", "amount": 40, "status": "pending"}])
+    _failing_writes(monkeypatch, store.users_file, times=2)
+    with pytest.raises(OSError):
+        store.run_transaction(_fund)
+    # loans.json already has the new status, users.json doesn't: only the journal knows
+    assert _on_disk(store.loans_file)["L1"]["status"] == "approved_by_lender"
+    assert _on_disk(store.users_file)["lender"]["balance"] == 100
+    assert os.path.exists(store.journal_file)
+
+    store.run_transaction(lambda txn: txn.put_user(dict(txn.get_user("other"), note="x")))
+    assert _on_disk(store.users_file)["lender"]["balance"] == 60
+    assert store.read_user("lender")["balance"] == 60
+    assert store.read_loan("L1")["status"] == "approved_by_lender"
+    assert store.read_user("other")["note"] == "x"
+    assert not os.path.exists(store.journal_file)
+
+def test_recover_replays_a_crashed_commit(data_dir):
+    _seed(users=[{"username": "ann", "balance": 1}])
+    users = [dict(store.read_user("ann"), balance=2)]
+    journal = {"files": {store.users_file: json.dumps(users)},
+               "meta": {"generation": store.generation() + 1, "committed_at": "2026-01-01T00:00:00"}}
+    with open(store.journal_file, "w", encoding="utf-8") as f:
+        json.dump(journal, f)
+    assert store.recover() is True
+    assert store.read_user("ann")["balance"] == 2
+    assert not os.path.exists(store.journal_file)
+
+def test_recover_discards_a_torn_journal(data_dir):
+    _seed(users=[{"username": "ann", "balance": 1}])
+    with open(store.journal_file, "w", encoding="utf-8") as f:
+        f.write('{"files": {"data/users.json": "[')
+    assert store.recover() is False
+    assert store.read_user("ann")["balance"] == 1
+    assert not os.path.exists(store.journal_file)
+
+
+# -----------------------------
+# Aggregates
+# -----------------------------
+def _register_amounts():
+    def _reduce(data, changes):
+        for _, old, new in changes:
+            if old:
+                data[old["borrower"]] = data.setdefault(old["borrower"], 0) - old["amount"]
+            if new:
+                data[new["borrower"]] = data.setdefault(new["borrower"], 0) + new["amount"]
+        return True
+
+    def _build(loans):
+        totals = {}
+        for loan in loans:
+            totals[loan["borrower"]] = totals.get(loan["borrower"], 0) + loan["amount"]
+        return totals
+    store.register_aggregate("amounts", _reduce, _build)
+
+def test_aggregate_follows_loan_changes(data_dir):
+    _seed(loans=[{"id": "L1", "borrower": "ann", "amount": 10}])
+    _register_amounts()
+    assert store.aggregate_get("amounts", "ann") == 10  # built on first use
+    store.run_transaction(lambda txn: txn.put_loan({"id": "L2", "borrower": "ann", "amount": 5}, insert=True))
+    store.run_transaction(lambda txn: txn.put_loan({"id": "L3", "borrower": "bob", "amount": 1}, insert=True))
+    assert dict(store.aggregate_items("amounts")) == {"ann": 15, "bob": 1}
+
+def test_aggregate_survives_commits_by_processes_without_it(data_dir, monkeypatch):
+    _seed(loans=[{"id": "L1", "borrower": "ann", "amount": 10}])
+    _register_amounts()
+    store.aggregate_get("amounts", "ann")
+    monkeypatch.setattr(store, "_aggregates", {})  # e.g. a script that never imported the module
+    store.run_transaction(lambda txn: txn.put_user({"username": "x"}, insert=True))
+    assert store.aggregate_get("amounts", "ann") == 10
+    # A loan change it can't follow drops the table, and the next reader rebuilds it
+    store.run_transaction(lambda txn: txn.put_loan({"id": "L2", "borrower": "ann", "amount": 5}, insert=True))
+    assert store.aggregate_get("amounts", "ann") is None
+    _register_amounts()
+    assert store.aggregate_get("amounts", "ann") == 15
+
+
+# -----------------------------
+# Loan change log
+# -----------------------------
+def test_change_log_restarted_in_place_is_read_from_the_start(data_dir):
+    _seed(loans=[{"id": "L1", "status": "pending"}])
+    start = store.generation()
+    store.run_transaction(lambda txn: txn.put_loan(dict(txn.get_loan("L1"), status="funded")))
+    assert store.loan_changes_since(start, start + 1) == [("L1", store.read_loan("L1"))]
+    # Same inode, new contents: e.g. the file was removed and the inode handed out again
+    with open(store.changes_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"generation": start + 2, "loans": [["L2", None]]}) + "\n")
+    assert store.loan_changes_since(start + 1, start + 2) == [("L2", None)]